@@ -6,150 +6,162 @@ Version enrichie avec génération IA de nouvelles recettes
 
 from flask import Flask, render_template, request, jsonify
 import json
-import sqlite3
 import random
 from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, namedtuple
+import heapq
 import os
+import threading
+import time
+from base_donnees import connexion, lire_version
+from cache import ABSENT, CacheLRU, cle_canonique
+from catalogue import comparer_recettes, mtimes_sources, obtenir_catalogue, recharger_catalogue
 from generateur_recettes import GenerateurRecettes
+from migrations import appliquer_migrations
+from reponses import reponse_json_ordonnee
+from cache_preferences import CachePreferences
+from index_produits import normaliser
+from moteur_scores import creer_moteur_scores
+from quantites import AgregateurQuantites
 
 app = Flask(__name__)
 
 # Configuration
 DB_PATH = 'data/assistant.db'
-RECETTES_PATH = 'data/recettes.json'
-PRODUITS_PATH = 'data/produits_coop.json'
+MOTEUR_SCORES = os.environ.get('MOTEUR_SCORES', 'index')  # 'index', 'python' ou 'numpy'
+TAILLE_CACHE_LISTES = int(os.environ.get('TAILLE_CACHE_LISTES', 128))
+TTL_CACHE_LISTES = int(os.environ.get('TTL_CACHE_LISTES', 300))  # secondes
+INTERVALLE_SURVEILLANCE = float(os.environ.get('ASSISTANT_SURVEILLANCE_CATALOGUE', 0))  # secondes, 0 = désactivée
+ADMIN_TOKEN = os.environ.get('ASSISTANT_ADMIN_TOKEN')  # Exigé par les routes /api/admin si défini
+
+# Catalogue et moteur de scores construit dessus : remplacés ensemble, en une affectation
+EtatCatalogue = namedtuple('EtatCatalogue', ['catalogue', 'moteur_scores'])
 
 class AssistantCourses:
-    def __init__(self):
-        self.recettes = self.charger_recettes()
-        self.produits = self.charger_produits()
-        self.charger_base_enrichie()  # Charger avant init DB
-        self.generateur = GenerateurRecettes(DB_PATH)
-        self.init_database()
-        
-    def charger_recettes(self):
-        with open(RECETTES_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    def __init__(self, initialiser_donnees=True):
+        catalogue = obtenir_catalogue()  # Charger avant init DB (snapshot compilé si à jour)
+        self._etat = EtatCatalogue(catalogue, None)
+        self._rechargement_lock = threading.Lock()
+        self.preferences = CachePreferences(DB_PATH)
+        self.generateur = GenerateurRecettes(DB_PATH, preferences=self.preferences, catalogue=catalogue)
+        if initialiser_donnees:
+            self.init_database(catalogue)
+        self.preferences.charger()
+        self._etat = EtatCatalogue(catalogue, self._creer_moteur_scores(catalogue))
+        self.generateur.planifier_reserve()  # Idées du jour prêtes avant la première requête
+        # Listes de courses calculées, invalidées quand le stock ou le catalogue change
+        self.cache_listes = CacheLRU(TAILLE_CACHE_LISTES, ttl=TTL_CACHE_LISTES)
+        if INTERVALLE_SURVEILLANCE > 0:
+            self.surveiller_catalogue(INTERVALLE_SURVEILLANCE)
+    
+    # Accès au catalogue courant (une requête qui lit plusieurs champs prend self._etat une fois)
+    catalogue = property(lambda self: self._etat.catalogue)
+    moteur_scores = property(lambda self: self._etat.moteur_scores)
+    recettes = property(lambda self: self._etat.catalogue.recettes)
+    produits = property(lambda self: self._etat.catalogue.produits)
+    index_produits = property(lambda self: self._etat.catalogue.index_produits)
+    recettes_enrichies = property(lambda self: self._etat.catalogue.recettes_enrichies or {})
+    toutes_recettes = property(lambda self: self._etat.catalogue.toutes_recettes)
     
-    def charger_produits(self):
-        with open(PRODUITS_PATH, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    def _creer_moteur_scores(self, catalogue):
+        moteur = creer_moteur_scores(MOTEUR_SCORES, catalogue.toutes_recettes, self.preferences)
+        if hasattr(moteur, 'mettre_a_jour_lot'):
+            self.preferences.abonner(moteur.mettre_a_jour_lot)
+        return moteur
+    
+    def recharger_catalogue(self):
+        """Relit les sources JSON modifiées et bascule sur le nouveau catalogue sans redémarrer
+        
+        Tout est construit à côté (catalogue, préférences des nouvelles recettes, moteur de
+        scores), puis basculé en une affectation : les requêtes en cours finissent sur l'ancien.
+        """
+        with self._rechargement_lock:
+            ancien = self._etat
+            nouveau_catalogue, sources = recharger_catalogue(ancien.catalogue)
+            if nouveau_catalogue is None:
+                return {'sources_modifiees': [], 'version': ancien.catalogue.version}
             
-    def charger_base_enrichie(self):
-        """Charge la base de recettes enrichie"""
-        try:
-            with open('data/recettes_enrichies.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.recettes_enrichies = data
-                # Fusionner avec les recettes de base
-                all_recettes = {}
-                all_recettes.update(data.get('recettes_base', {}))
-                all_recettes.update(data.get('banque_recettes', {}))
-                self.toutes_recettes = all_recettes
-        except FileNotFoundError:
-            print("⚠️ Fichier recettes enrichies non trouvé, utilisation base standard")
-            self.recettes_enrichies = {}
-            self.toutes_recettes = self.recettes.get('recettes_recurrentes', {})
+            differences = comparer_recettes(ancien.catalogue, nouveau_catalogue)
+            if differences['ajoutees']:
+                self.initialiser_preferences(nouveau_catalogue, differences['ajoutees'])
+                self.preferences.charger(differences['ajoutees'])
             
-    def init_database(self):
-        """Initialise la base de données SQLite pour l'apprentissage"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Table des préférences utilisateur
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS preferences_recettes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                recette_id TEXT,
-                choisi INTEGER DEFAULT 0,
-                refuse INTEGER DEFAULT 0,
-                date_derniere_suggestion DATE,
-                date_derniere_preparation DATE,
-                note_utilisateur INTEGER,
-                frequence_reelle INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # Table des stocks
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS stock_maison (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ingredient TEXT UNIQUE,
-                quantite REAL,
-                unite TEXT,
-                date_achat DATE,
-                date_peremption DATE,
-                niveau_stock TEXT DEFAULT 'moyen'
-            )
-        ''')
-        
-        # Table historique des courses
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS historique_courses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date_courses DATE,
-                recettes_choisies TEXT,
-                liste_courses TEXT,
-                total_estime REAL,
-                commentaires TEXT
-            )
-        ''')
-        
-        # Table apprentissage habitudes
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS habitudes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pattern_type TEXT,
-                pattern_data TEXT,
-                frequence INTEGER DEFAULT 1,
-                derniere_occurrence DATE
-            )
-        ''')
+            moteur = ancien.moteur_scores
+            if nouveau_catalogue.toutes_recettes != ancien.catalogue.toutes_recettes:
+                moteur = self._creer_moteur_scores(nouveau_catalogue)
+            
+            if 'recettes_enrichies' in sources:
+                self.generateur.catalogue = nouveau_catalogue
+                self.generateur.charger_patterns()
+            
+            self._etat = EtatCatalogue(nouveau_catalogue, moteur)  # Bascule atomique
+            if moteur is not ancien.moteur_scores and hasattr(ancien.moteur_scores, 'mettre_a_jour_lot'):
+                self.preferences.desabonner(ancien.moteur_scores.mettre_a_jour_lot)
         
-        conn.commit()
-        conn.close()
+        print(f"🔄 Catalogue rechargé ({', '.join(sources)}) : {len(differences['ajoutees'])} ajoutées, "
+              f"{len(differences['supprimees'])} supprimées, {len(differences['modifiees'])} modifiées")
+        return {'sources_modifiees': sources, 'version': nouveau_catalogue.version, **differences}
+    
+    def surveiller_catalogue(self, intervalle):
+        """Thread de fond : recharge le catalogue dès qu'un fichier source change"""
+        def surveiller():
+            mtimes = mtimes_sources()
+            while True:
+                time.sleep(intervalle)
+                actuels = mtimes_sources()
+                if actuels == mtimes:
+                    continue
+                mtimes = actuels
+                try:
+                    self.recharger_catalogue()
+                except (OSError, ValueError) as e:
+                    # JSON invalide : ancien catalogue conservé, nouvel essai à la prochaine modification
+                    print(f"⚠️ Rechargement catalogue impossible: {e}")
+        
+        threading.Thread(target=surveiller, daemon=True, name='surveillance-catalogue').start()
+            
+    @staticmethod
+    def init_database(catalogue):
+        """Initialise la base de données SQLite pour l'apprentissage"""
+        # Création et mise à niveau du schéma (tables, index, contraintes)
+        with connexion(DB_PATH) as conn:
+            appliquer_migrations(conn)
         
         # Initialiser les préférences pour toutes les recettes
-        self.initialiser_preferences()
+        AssistantCourses.initialiser_preferences(catalogue)
     
-    def initialiser_preferences(self):
-        """Initialise les préférences avec toutes les recettes disponibles"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+    @staticmethod
+    def initialiser_preferences(catalogue, recettes_ids=None):
+        """Initialise les préférences des recettes du catalogue (toutes, ou seulement recettes_ids)"""
+        # Score élevé pour les favoris
+        frequence_map = {
+            'tres_frequent': 10,
+            'frequent': 8,
+            'occasionnel': 6,
+            'weekend': 5
+        }
         
         # 1. Recettes de base (favoris Michael)
-        for recette_id, recette_data in self.recettes.get('recettes_recurrentes', {}).items():
-            cursor.execute('SELECT id FROM preferences_recettes WHERE recette_id = ?', (recette_id,))
-            if not cursor.fetchone():
-                # Score élevé pour les favoris
-                frequence_map = {
-                    'tres_frequent': 10,
-                    'frequent': 8,
-                    'occasionnel': 6,
-                    'weekend': 5
-                }
-                freq_init = frequence_map.get(recette_data.get('frequence', 'frequent'), 7)
-                
-                cursor.execute('''
-                    INSERT INTO preferences_recettes (recette_id, choisi, frequence_reelle)
-                    VALUES (?, ?, ?)
-                ''', (recette_id, freq_init, freq_init))
-        
-        # 2. Recettes enrichies (base + banque)
-        for recette_id, recette_data in self.toutes_recettes.items():
-            cursor.execute('SELECT id FROM preferences_recettes WHERE recette_id = ?', (recette_id,))
-            if not cursor.fetchone():
-                # Score selon la pertinence estimée
-                score_base = recette_data.get('score_base', 5)
-                
-                cursor.execute('''
-                    INSERT INTO preferences_recettes (recette_id, choisi, frequence_reelle)
-                    VALUES (?, 0, ?)
-                ''', (recette_id, score_base))
-        
-        conn.commit()
-        conn.close()
+        lignes = []
+        for recette_id, recette_data in catalogue.recettes.get('recettes_recurrentes', {}).items():
+            freq_init = frequence_map.get(recette_data.get('frequence', 'frequent'), 7)
+            lignes.append((recette_id, freq_init, freq_init))
+        
+        # 2. Recettes enrichies (base + banque), score selon la pertinence estimée
+        for recette_id, recette_data in catalogue.toutes_recettes.items():
+            lignes.append((recette_id, 0, recette_data.get('score_base', 5)))
+        
+        if recettes_ids is not None:
+            recettes_ids = set(recettes_ids)
+            lignes = [ligne for ligne in lignes if ligne[0] in recettes_ids]
+        
+        # Insertion en bloc, les recettes déjà connues sont ignorées (recette_id UNIQUE)
+        with connexion(DB_PATH) as conn:
+            conn.executemany('''
+                INSERT INTO preferences_recettes (recette_id, choisi, frequence_reelle)
+                VALUES (?, ?, ?)
+                ON CONFLICT (recette_id) DO NOTHING
+            ''', lignes)
     
     def analyser_habitudes_temporelles(self):
         """Analyse les habitudes selon le jour de la semaine, saison, etc."""
@@ -174,86 +186,43 @@ class AssistantCourses:
     
     def suggerer_recettes(self, nombre=6, forcer_nouvelles=False):
         """Suggère des recettes basées sur les habitudes et l'apprentissage"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Récupérer les préférences actuelles
-        cursor.execute('''
-            SELECT recette_id, choisi, refuse, date_derniere_preparation, frequence_reelle
-            FROM preferences_recettes
-        ''')
-        preferences_data = cursor.fetchall()
-        conn.close()
+        # Choix faits dans un autre worker depuis la dernière synchronisation
+        self.preferences.synchroniser()
         
         # Analyser les habitudes temporelles
         habitudes = self.analyser_habitudes_temporelles()
-        
-        suggestions = []
-        recettes_scores = {}
+        etat = self._etat  # Catalogue et moteur cohérents même si un rechargement a lieu
+        toutes_recettes = etat.catalogue.toutes_recettes
         
         # 1. SCORING DES RECETTES EXISTANTES (BASE + BANQUE)
-        for recette_id, recette_data in self.toutes_recettes.items():
-            score = recette_data.get('score_base', 5)  # Score de base
-            
-            # Score basé sur les préférences historiques
-            pref = next((p for p in preferences_data if p[0] == recette_id), None)
-            if pref:
-                choisi, refuse, derniere_prep, freq = pref[1], pref[2], pref[3], pref[4]
-                score += choisi * 2  # Points pour les choix positifs
-                score -= refuse * 3  # Pénalité pour les refus
-                
-                # Bonus si pas préparée récemment
-                if derniere_prep:
-                    jours_depuis = (datetime.now() - datetime.strptime(derniere_prep, '%Y-%m-%d')).days
-                    score += min(jours_depuis / 7, 3)  # Max 3 points bonus après 3 semaines
-                else:
-                    score += 2  # Bonus pour nouveauté
-            else:
-                score += 1  # Petit bonus pour recettes jamais essayées
-            
-            # Score basé sur les habitudes temporelles
-            if recette_data.get('type') in habitudes.get('type_preferred', []):
-                score += 3
-            
-            if recette_data.get('temps_prep', 30) <= habitudes.get('temps_autorise', 30):
-                score += 2
-            
-            # Bonus cuisine préférée
-            if recette_data.get('cuisine') in ['french', 'italian', 'fusion']:
-                score += 1
-            
-            # Bonus pour recettes adaptées famille
-            if recette_data.get('difficulte') in ['facile', 'moyen']:
-                score += 1
-            
-            recettes_scores[recette_id] = score
+        # Parcours paresseux par score décroissant : seul le haut du classement est évalué
+        recettes_triees = etat.moteur_scores.parcourir(habitudes)
         
         # 2. AJOUTER RECETTES GÉNÉRÉES IA SI DEMANDÉ
-        if forcer_nouvelles or len(recettes_scores) < nombre:
+        if forcer_nouvelles or len(toutes_recettes) < nombre:
             nouvelles_recettes = self.generateur.generer_suggestions_enrichies(2)
-            for nouvelle in nouvelles_recettes:
-                if nouvelle.get('nouveau'):  # Recette générée IA
-                    recettes_scores[nouvelle['id']] = nouvelle['score_ia']
+            scores_ia = sorted(
+                ((nouvelle['id'], nouvelle['score_ia']) for nouvelle in nouvelles_recettes if nouvelle.get('nouveau')),
+                key=lambda x: x[1], reverse=True
+            )
+            # Fusion stable : à score égal les recettes existantes restent devant
+            recettes_triees = heapq.merge(recettes_triees, scores_ia, key=lambda x: x[1], reverse=True)
         
         # 3. SÉLECTION FINALE INTELLIGENTE
-        if not recettes_scores:
-            # Fallback si aucune recette
-            return self._suggestions_fallback()
-        
-        # Trier par score
-        recettes_triees = sorted(recettes_scores.items(), key=lambda x: x[1], reverse=True)
-        
         # Sélection avec variété
         suggestions_finales = []
-        types_utilises = []
-        cuisines_utilisees = []
+        types_utilises = {}
+        cuisines_utilisees = {}
+        ecartees = []  # Recettes écartées pour la variété, dans l'ordre du classement
+        aucune_recette = True
         
         for recette_id, score in recettes_triees:
+            aucune_recette = False
             if len(suggestions_finales) >= nombre:
                 break
                 
             # Récupérer les données de la recette
-            recette_data = self.toutes_recettes.get(recette_id)
+            recette_data = toutes_recettes.get(recette_id)
             if not recette_data:
                 continue
             
@@ -261,12 +230,9 @@ class AssistantCourses:
             type_recette = recette_data.get('type', 'autre')
             cuisine = recette_data.get('cuisine', 'autre')
             
-            # Limiter répétition du même type (max 2)
-            if types_utilises.count(type_recette) >= 2:
-                continue
-            
-            # Limiter répétition de la même cuisine (max 3)
-            if cuisines_utilisees.count(cuisine) >= 3:
+            # Limiter répétition du même type (max 2) et de la même cuisine (max 3)
+            if types_utilises.get(type_recette, 0) >= 2 or cuisines_utilisees.get(cuisine, 0) >= 3:
+                ecartees.append((recette_id, score, recette_data))
                 continue
             
             suggestions_finales.append({
@@ -280,28 +246,25 @@ class AssistantCourses:
                 'nouveau': recette_data.get('generee_ia', False)
             })
             
-            types_utilises.append(type_recette)
-            cuisines_utilisees.append(cuisine)
-        
-        # Si pas assez de suggestions, compléter avec le reste
-        if len(suggestions_finales) < nombre:
-            for recette_id, score in recettes_triees:
-                if len(suggestions_finales) >= nombre:
-                    break
-                if recette_id in [s['id'] for s in suggestions_finales]:
-                    continue
-                    
-                recette_data = self.toutes_recettes.get(recette_id)
-                if recette_data:
-                    suggestions_finales.append({
-                        'id': recette_id,
-                        'nom': recette_data['nom'],
-                        'temps_prep': recette_data['temps_prep'],
-                        'difficulte': recette_data['difficulte'],
-                        'portions': recette_data['portions'],
-                        'tags': recette_data.get('tags', []),
-                        'score_ia': round(score, 1)
-                    })
+            types_utilises[type_recette] = types_utilises.get(type_recette, 0) + 1
+            cuisines_utilisees[cuisine] = cuisines_utilisees.get(cuisine, 0) + 1
+        
+        if aucune_recette:
+            # Fallback si aucune recette
+            return self._suggestions_fallback()
+        
+        # Si pas assez de suggestions, compléter avec les recettes écartées
+        # (le classement a alors été parcouru en entier)
+        for recette_id, score, recette_data in ecartees[:nombre - len(suggestions_finales)]:
+            suggestions_finales.append({
+                'id': recette_id,
+                'nom': recette_data['nom'],
+                'temps_prep': recette_data['temps_prep'],
+                'difficulte': recette_data['difficulte'],
+                'portions': recette_data['portions'],
+                'tags': recette_data.get('tags', []),
+                'score_ia': round(score, 1)
+            })
         
         return suggestions_finales
     
@@ -319,12 +282,11 @@ class AssistantCourses:
     
     def verifier_stock(self, ingredients_requis):
         """Vérifie le stock actuel et demande ce qui manque"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT ingredient, quantite, niveau_stock FROM stock_maison')
-        stock_actuel = {row[0]: {'quantite': row[1], 'niveau': row[2]} for row in cursor.fetchall()}
-        conn.close()
+        with connexion(DB_PATH) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT ingredient, quantite, niveau_stock FROM stock_maison')
+            stock_actuel = {row[0]: {'quantite': row[1], 'niveau': row[2]} for row in cursor.fetchall()}
         
         ingredients_a_acheter = []
         ingredients_en_stock = []
@@ -357,51 +319,76 @@ class AssistantCourses:
         }
     
     def generer_liste_courses(self, recettes_choisies):
-        """Génère la liste de courses optimisée par rayon Coop"""
+        """Génère la liste de courses optimisée par rayon Coop (mise en cache)"""
+        # Sélection canonique : le résultat ne dépend que des recettes choisies, pas de leur ordre
+        recettes_choisies = sorted(recettes_choisies, key=str)
+        catalogue = self.catalogue
+        with connexion(DB_PATH) as conn:
+            version = (catalogue.version, lire_version(conn, 'stock'))
+        
+        self.cache_listes.valider_version(version)
+        cle = cle_canonique(recettes_choisies)
+        liste = self.cache_listes.get(cle)
+        if liste is ABSENT:
+            liste = self._calculer_liste_courses(recettes_choisies, catalogue)
+            self.cache_listes.set(cle, liste, version)
+        return liste
+    
+    def _calculer_liste_courses(self, recettes_choisies, catalogue):
         tous_ingredients = {}
+        quantites = AgregateurQuantites()
+        libelles = {}  # nom normalisé → premier libellé rencontré ('oignon' et 'oignons' : un seul article)
         
         # Collecter tous les ingrédients des recettes choisies
         for recette_id in recettes_choisies:
-            recette = self.recettes['recettes_recurrentes'].get(recette_id)
+            recette = catalogue.recettes['recettes_recurrentes'].get(recette_id)
             if recette:
                 for ingredient, details in recette['ingredients'].items():
-                    if ingredient in tous_ingredients:
-                        # Combiner les quantités si même ingrédient
-                        continue  # Pour l'instant, on garde la première occurrence
-                    tous_ingredients[ingredient] = details
+                    cle = normaliser(ingredient)
+                    quantites.ajouter(cle, details['quantite'])
+                    if cle not in libelles:
+                        libelles[cle] = ingredient
+                        tous_ingredients[ingredient] = dict(details)
+                    elif details.get('obligatoire'):
+                        tous_ingredients[libelles[cle]]['obligatoire'] = True
+        
+        # Quantités totales, formatées une seule fois
+        for cle, ingredient in libelles.items():
+            tous_ingredients[ingredient]['quantite'] = quantites.formater(cle)
         
         # Vérifier le stock
         verification_stock = self.verifier_stock(tous_ingredients)
         
         # Organiser par rayons Coop
         liste_par_rayon = defaultdict(list)
+        produits_ajoutes = set()
         total_estime = 0
         
         for ingredient in verification_stock['a_acheter']:
-            nom_ingredient = ingredient['ingredient']
-            rayon = ingredient['rayon']
+            # Ingrédients hors rayons Coop (produits de base du rayon 'stock') : pas dans la liste
+            if ingredient['rayon'] not in catalogue.produits['rayons']:
+                continue
             
-            # Trouver le produit Coop correspondant
-            if rayon in self.produits['rayons']:
-                produits_rayon = self.produits['rayons'][rayon]['produits']
-                if nom_ingredient in produits_rayon:
-                    produit = produits_rayon[nom_ingredient]
-                    liste_par_rayon[rayon].append({
-                        'nom': produit['nom'],
-                        'quantite': ingredient['quantite'],
-                        'unite': produit['unite'],
-                        'prix_estime': produit['prix_moyen'],
-                        'obligatoire': ingredient['obligatoire'],
-                        'status': ingredient['status']
-                    })
-                    total_estime += produit['prix_moyen']
+            # Trouver le produit Coop correspondant (nom normalisé : 'oignon' → 'oignons')
+            produit = catalogue.index_produits.chercher(ingredient['ingredient'])
+            if produit and produit.cle not in produits_ajoutes:
+                produits_ajoutes.add(produit.cle)
+                liste_par_rayon[produit.rayon].append({
+                    'nom': produit.nom,
+                    'quantite': ingredient['quantite'],
+                    'unite': produit.unite,
+                    'prix_estime': produit.prix,
+                    'obligatoire': ingredient['obligatoire'],
+                    'status': ingredient['status']
+                })
+                total_estime += produit.prix
         
-        # Trier par ordre des rayons Coop
-        liste_optimisee = {}
-        for rayon in sorted(self.produits['rayons'].keys(), 
-                           key=lambda x: self.produits['rayons'][x]['ordre']):
-            if rayon in liste_par_rayon:
-                liste_optimisee[self.produits['rayons'][rayon]['nom']] = liste_par_rayon[rayon]
+        # Rayons dans l'ordre de passage Coop (précalculé)
+        liste_optimisee = {
+            catalogue.index_produits.noms_rayons[rayon]: liste_par_rayon[rayon]
+            for rayon in catalogue.index_produits.rayons
+            if rayon in liste_par_rayon
+        }
         
         return {
             'liste_par_rayon': liste_optimisee,
@@ -410,29 +397,47 @@ class AssistantCourses:
             'nombre_articles': sum(len(articles) for articles in liste_optimisee.values())
         }
     
+    def lire_stock(self):
+        """Stock maison trié par ingrédient"""
+        with connexion(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT ingredient, quantite, unite, niveau_stock FROM stock_maison ORDER BY ingredient')
+            return [{'ingredient': row[0], 'quantite': row[1], 'unite': row[2], 'niveau': row[3]} 
+                    for row in cursor.fetchall()]
+    
+    def mettre_a_jour_stock(self, updates):
+        """Ajoute ou remplace des lignes du stock maison (une transaction)"""
+        with connexion(DB_PATH) as conn:
+            cursor = conn.cursor()
+            
+            for update in updates:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO stock_maison (ingredient, quantite, unite, niveau_stock, date_achat)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (update['ingredient'], update['quantite'], update['unite'], 
+                     update['niveau'], datetime.now().date()))
+    
     def enregistrer_choix(self, recette_id, choix_type):
         """Enregistre les choix de l'utilisateur pour l'apprentissage"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        if choix_type == 'choisi':
-            cursor.execute('''
-                UPDATE preferences_recettes 
-                SET choisi = choisi + 1, date_derniere_suggestion = ?
-                WHERE recette_id = ?
-            ''', (datetime.now().date(), recette_id))
-        elif choix_type == 'refuse':
-            cursor.execute('''
-                UPDATE preferences_recettes 
-                SET refuse = refuse + 1, date_derniere_suggestion = ?
-                WHERE recette_id = ?
-            ''', (datetime.now().date(), recette_id))
-        
-        conn.commit()
-        conn.close()
+        self.preferences.enregistrer_choix(recette_id, choix_type)
+
+# Instance du processus, créée par create_app() (une par worker gunicorn)
+assistant = None
 
-# Instance globale
-assistant = AssistantCourses()
+def initialiser_donnees():
+    """Schéma, snapshot du catalogue et préférences de départ (une fois, avant les workers)"""
+    AssistantCourses.init_database(obtenir_catalogue())
+
+def create_app():
+    """Point d'entrée WSGI : gunicorn -c gunicorn.conf.py (ASSISTANT_APP=app)
+    
+    Construit l'assistant du processus ; l'initialisation des données est sautée si
+    le processus maître l'a déjà faite (ASSISTANT_DONNEES_INITIALISEES=1).
+    """
+    global assistant
+    if assistant is None:
+        assistant = AssistantCourses(initialiser_donnees=os.environ.get('ASSISTANT_DONNEES_INITIALISEES') != '1')
+    return app
 
 # Routes Flask
 @app.route('/')
@@ -472,7 +477,7 @@ def get_nouvelles_recettes():
     
     nouvelles = []
     for i in range(nombre):
-        recette = assistant.generateur.generer_recette_contextuelle(contexte)
+        recette = assistant.generateur.tirer_recette(contexte)
         recette_id = f"ia_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}"
         
         nouvelles.append({
@@ -503,45 +508,27 @@ def enrichir_base():
 @app.route('/api/liste-courses', methods=['POST'])
 def generer_liste():
     recettes_choisies = request.json.get('recettes', [])
-    liste = assistant.generer_liste_courses(recettes_choisies)
     
-    # Enregistrer l'historique
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO historique_courses (date_courses, recettes_choisies, liste_courses, total_estime)
-        VALUES (?, ?, ?, ?)
-    ''', (datetime.now().date(), json.dumps(recettes_choisies), json.dumps(liste), liste['total_estime']))
-    conn.commit()
-    conn.close()
+    # Une seule connexion pour la vérification du stock et l'historique
+    with connexion(DB_PATH) as conn:
+        liste = assistant.generer_liste_courses(recettes_choisies)
+        
+        # Enregistrer l'historique
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO historique_courses (date_courses, recettes_choisies, liste_courses, total_estime)
+            VALUES (?, ?, ?, ?)
+        ''', (datetime.now().date(), json.dumps(recettes_choisies), json.dumps(liste), liste['total_estime']))
     
-    return jsonify(liste)
+    return reponse_json_ordonnee(app, liste)
 
 @app.route('/api/stock', methods=['GET', 'POST'])
 def gerer_stock():
     if request.method == 'GET':
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT ingredient, quantite, unite, niveau_stock FROM stock_maison ORDER BY ingredient')
-        stock = [{'ingredient': row[0], 'quantite': row[1], 'unite': row[2], 'niveau': row[3]} 
-                for row in cursor.fetchall()]
-        conn.close()
-        return jsonify(stock)
+        return jsonify(assistant.lire_stock())
     
     elif request.method == 'POST':
-        updates = request.json.get('updates', [])
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        for update in updates:
-            cursor.execute('''
-                INSERT OR REPLACE INTO stock_maison (ingredient, quantite, unite, niveau_stock, date_achat)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (update['ingredient'], update['quantite'], update['unite'], 
-                 update['niveau'], datetime.now().date()))
-        
-        conn.commit()
-        conn.close()
+        assistant.mettre_a_jour_stock(request.json.get('updates', []))
         return jsonify({'status': 'success'})
 
 @app.route('/api/choix', methods=['POST'])
@@ -552,25 +539,35 @@ def enregistrer_choix():
     assistant.enregistrer_choix(recette_id, choix)
     return jsonify({'status': 'success'})
 
+@app.route('/api/admin/recharger-catalogue', methods=['POST'])
+def recharger_catalogue_admin():
+    """Recharge les sources JSON modifiées sans redémarrer l'application"""
+    if ADMIN_TOKEN and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({'error': 'Accès refusé'}), 403
+    try:
+        resultat = assistant.recharger_catalogue()
+    except (OSError, ValueError) as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+    return jsonify({'status': 'success', **resultat})
+
 @app.route('/api/historique')
 def get_historique():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT date_courses, recettes_choisies, total_estime 
-        FROM historique_courses 
-        ORDER BY date_courses DESC 
-        LIMIT 10
-    ''')
-    historique = []
-    for row in cursor.fetchall():
-        recettes = json.loads(row[1]) if row[1] else []
-        historique.append({
-            'date': row[0],
-            'recettes': recettes,
-            'total': row[2]
-        })
-    conn.close()
+    with connexion(DB_PATH) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT date_courses, recettes_choisies, total_estime 
+            FROM historique_courses 
+            ORDER BY date_courses DESC 
+            LIMIT 10
+        ''')
+        historique = []
+        for row in cursor.fetchall():
+            recettes = json.loads(row[1]) if row[1] else []
+            historique.append({
+                'date': row[0],
+                'recettes': recettes,
+                'total': row[2]
+            })
     return jsonify(historique)
 
 @app.route('/api/simple-courses', methods=['POST'])
@@ -691,4 +688,4 @@ if __name__ == '__main__':
     os.makedirs('static/css', exist_ok=True)
     os.makedirs('static/js', exist_ok=True)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
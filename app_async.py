@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Assistant Courses - service asynchrone (ASGI, Quart)
+Mêmes réponses que app.py / app_final.py pour les routes appelées par les téléphones ;
+SQLite et les calculs tournent dans un pool de threads borné, la boucle reste libre
+    hypercorn 'app_async:create_app()' --bind 0.0.0.0:5002
+    ASSISTANT_APP=app_async gunicorn -c gunicorn.conf.py   (workers uvicorn)
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from werkzeug.sansio.http import is_resource_modified
+
+try:
+    from quart import Quart, Response, jsonify, request
+except ImportError:  # Quart est optionnel : pip install quart
+    Quart = None
+
+import app as app_courses
+import app_final
+from base_donnees import TAILLE_POOL
+from reponses import reponse_json_ordonnee
+
+# Autant de threads que de connexions SQLite : aucun thread n'attend le pool
+NB_THREADS_ASYNC = int(os.environ.get('ASSISTANT_THREADS_ASYNC', TAILLE_POOL))
+
+app = None
+_executeur = None
+
+
+def initialiser_donnees():
+    """Schéma, snapshot du catalogue et préférences de départ (une fois, avant les workers)"""
+    app_courses.initialiser_donnees()
+    app_final.initialiser_donnees()
+
+
+async def executer(fonction, *args, **kwargs):
+    """Appel bloquant (SQLite, JSON, calcul) dans le pool de threads borné"""
+    return await asyncio.get_running_loop().run_in_executor(_executeur, partial(fonction, *args, **kwargs))
+
+
+def create_app():
+    """Point d'entrée ASGI : les deux assistants du processus et les routes async"""
+    global app, _executeur
+    if app is not None:
+        return app
+    if Quart is None:
+        raise RuntimeError("❌ Quart n'est pas installé (pip install quart)")
+
+    app_courses.create_app()
+    app_final.create_app()
+    _executeur = ThreadPoolExecutor(NB_THREADS_ASYNC, thread_name_prefix='assistant-async')
+    app = Quart(__name__)
+
+    @app.after_serving
+    async def arreter():
+        _executeur.shutdown(wait=True)
+        app_courses.assistant.preferences.vider_ecritures()  # Choix encore en file
+
+    @app.route('/api/suggestions')
+    async def get_suggestions():
+        nombre = request.args.get('nombre', 6, type=int)
+        nouvelles = request.args.get('nouvelles', False, type=bool)
+        suggestions = await executer(app_courses.assistant.suggerer_recettes, nombre, forcer_nouvelles=nouvelles)
+        return jsonify(suggestions)
+
+    @app.route('/api/stock', methods=['GET', 'POST'])
+    async def gerer_stock():
+        if request.method == 'GET':
+            return jsonify(await executer(app_courses.assistant.lire_stock))
+
+        data = await request.get_json()
+        await executer(app_courses.assistant.mettre_a_jour_stock, data.get('updates', []))
+        return jsonify({'status': 'success'})
+
+    @app.route('/api/ingredients/<int:recette_id>')
+    async def get_ingredients(recette_id):
+        """Ingrédients d'une recette, corps mis en cache et GET conditionnel comme app_final"""
+        nb_personnes = request.args.get('personnes', 2.5, type=float)
+        assistant = app_final.assistant
+
+        def construire():
+            nom_recette, ingredients = assistant.get_ingredients_recette(recette_id, nb_personnes)
+            if not nom_recette:
+                return None
+            return {
+                'nom': nom_recette,
+                'nb_personnes': nb_personnes,
+                'ingredients': ingredients
+            }
+
+        entree = await executer(app_final.entree_catalogue, ('ingredients', recette_id, nb_personnes), construire)
+        if entree is None:
+            return jsonify({'error': 'Recette non trouvée'}), 404
+
+        corps, etag, derniere_modif = entree
+        # Même règle que make_conditional de Flask : If-None-Match prime, sinon If-Modified-Since
+        modifie = is_resource_modified(
+            http_if_none_match=request.headers.get('If-None-Match'),
+            http_if_modified_since=request.headers.get('If-Modified-Since'),
+            etag=etag,
+            last_modified=derniere_modif
+        )
+        if modifie:
+            reponse = Response(corps, mimetype='application/json')
+        else:
+            reponse = Response(b'', status=304)
+        reponse.set_etag(etag)
+        reponse.last_modified = derniere_modif
+        reponse.cache_control.no_cache = True
+        return reponse
+
+    @app.route('/api/liste-courses-finale', methods=['POST'])
+    async def generer_liste_finale():
+        data = await request.get_json()
+        recettes_ids = [int(id) for id in data.get('recettes', [])]
+        liste = await executer(
+            app_final.assistant.generer_liste_courses_complete,
+            recettes_ids,
+            data.get('personnes', 2.5),
+            data.get('stock', {})
+        )
+        return reponse_json_ordonnee(app, liste)
+
+    return app
+
+
+if __name__ == '__main__':
+    create_app().run(host='0.0.0.0', port=5002)
@@ -5,90 +5,197 @@ Utilise vraie base de données Marmiton avec calculs par personne
 """
 
 from flask import Flask, render_template, request, jsonify
-import sqlite3
+import base64
+import hashlib
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 import os
+import threading
+import time
+from base_donnees import connexion, lire_version
+from cache import ABSENT, CacheLRU, cle_canonique
+from catalogue import obtenir_catalogue
+from listes_courses import LISTES_PAR_REQUETE_MAX, MatriceIngredients, TravailInvalide, construire_liste, valider_travail
+from matrice_stock import MatriceStock
+from migrations import appliquer_migrations
+from reponses import reponse_json_ordonnee
+from recherche import IndexRecherche
+from quantites import formater_quantite, mettre_a_echelle
 
 app = Flask(__name__)
 DB_PATH = 'data/assistant.db'
+TAILLE_CACHE_INGREDIENTS = int(os.environ.get('TAILLE_CACHE_INGREDIENTS', 512))
+TAILLE_CACHE_REPONSES = int(os.environ.get('TAILLE_CACHE_REPONSES', 256))
+TAILLE_CACHE_LISTES = int(os.environ.get('TAILLE_CACHE_LISTES', 128))
+LIMITE_PAGE_RECETTES = 50
+LIMITE_PAGE_RECETTES_MAX = 500
+
+# Champs exposés par /api/recettes → expression SQL (seuls les champs demandés sont lus)
+CHAMPS_RECETTES = {
+    'id': 'id',
+    'nom': 'nom',
+    'categorie': 'categorie',
+    'difficulte': 'difficulte',
+    'temps_prep': 'temps_prep',
+    'temps_cuisson': 'temps_cuisson',
+    'portions': 'portions',
+    'description': 'description',
+    'temps_total': 'COALESCE(temps_prep, 0) + COALESCE(temps_cuisson, 0)',  # NULL compté 0, comme en Python
+}
+PARAMETRES_PAGINATION = {'limite', 'curseur', 'categorie', 'difficulte', 'temps_max', 'fields'}
+TTL_CACHE_LISTES = int(os.environ.get('TTL_CACHE_LISTES', 300))  # secondes
 
 class AssistantCoursesMarmiton:
-    def __init__(self):
+    def __init__(self, taille_cache=TAILLE_CACHE_INGREDIENTS, initialiser_donnees=True):
         self.db_path = DB_PATH
+        # Ingrédients calculés par (recette_id, nb_personnes), invalidés quand le catalogue change
+        self.cache_ingredients = CacheLRU(taille_cache)
+        # Réponses JSON déjà sérialisées (corps, ETag, Last-Modified) des routes catalogue
+        self.cache_reponses = CacheLRU(TAILLE_CACHE_REPONSES)
+        # Listes de courses par (sélection, personnes, stock déclaré), invalidées avec le catalogue
+        self.cache_listes = CacheLRU(TAILLE_CACHE_LISTES, ttl=TTL_CACHE_LISTES)
+        # Ordre des rayons Coop, précalculé au chargement du catalogue
+        self.index_produits = obtenir_catalogue().index_produits
+        # Matrice recettes × ingrédients pour les listes en lot (chargée au premier lot)
+        self._matrice = None
+        self._matrice_stock = None
+        self._index_recherche = None
+        self._matrice_lock = threading.Lock()
+        if initialiser_donnees:
+            with connexion(self.db_path) as conn:
+                appliquer_migrations(conn)
+    
+    def version_catalogue(self):
+        """Version du catalogue Marmiton (incrémentée par triggers à chaque écriture)"""
+        with connexion(self.db_path) as conn:
+            return lire_version(conn, 'catalogue')
     
     def get_toutes_recettes(self):
         """Récupère toutes les recettes de la base Marmiton"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with connexion(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id, nom, categorie, difficulte, temps_prep, temps_cuisson, 
+                       portions, description
+                FROM recettes_marmiton
+                ORDER BY categorie_tri, nom
+            ''')
+            
+            recettes = []
+            for row in cursor.fetchall():
+                recettes.append({
+                    'id': row[0],
+                    'nom': row[1],
+                    'categorie': row[2],
+                    'difficulte': row[3],
+                    'temps_prep': row[4],
+                    'temps_cuisson': row[5],
+                    'portions': row[6],
+                    'description': row[7],
+                    'temps_total': (row[4] or 0) + (row[5] or 0)
+                })
+        return recettes
+    
+    def page_recettes(self, champs, categorie=None, difficulte=None, temps_max=None, apres=None, limite=LIMITE_PAGE_RECETTES):
+        """Page de recettes triées par (categorie, nom, id)
         
-        cursor.execute('''
-            SELECT id, nom, categorie, difficulte, temps_prep, temps_cuisson, 
-                   portions, description
-            FROM recettes_marmiton
-            ORDER BY categorie, nom
-        ''')
-        
-        recettes = []
-        for row in cursor.fetchall():
-            recettes.append({
-                'id': row[0],
-                'nom': row[1],
-                'categorie': row[2],
-                'difficulte': row[3],
-                'temps_prep': row[4],
-                'temps_cuisson': row[5],
-                'portions': row[6],
-                'description': row[7],
-                'temps_total': row[4] + row[5]
-            })
+        Pagination par curseur : apres = (categorie_tri, nom, id) de la dernière recette
+        de la page précédente, l'index de la migration 9 évite tout OFFSET. Une recette
+        sans catégorie est triée sous '' (categorie_tri) : NULL casserait la comparaison.
+        Retourne [(cle_tri, valeurs des champs)] pour au plus limite + 1 recettes :
+        la dernière, si elle existe, indique qu'une page suivante existe. Lues en
+        entier avant de rendre la connexion (page bornée) : seule la sérialisation
+        est envoyée en flux.
+        """
+        conditions = []
+        parametres = []
+        if categorie is not None:
+            conditions.append('categorie_tri = ?')
+            parametres.append(categorie)
+        if difficulte is not None:
+            conditions.append('difficulte = ?')
+            parametres.append(difficulte)
+        if temps_max is not None:
+            conditions.append(f"{CHAMPS_RECETTES['temps_total']} <= ?")
+            parametres.append(temps_max)
+        if apres is not None:
+            conditions.append('(categorie_tri, nom, id) > (?, ?, ?)')
+            parametres.extend(apres)
         
-        conn.close()
-        return recettes
+        colonnes = ', '.join(CHAMPS_RECETTES[champ] for champ in champs)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        parametres.append(limite + 1)
+        
+        with connexion(self.db_path) as conn:
+            cursor = conn.execute(f'''
+                SELECT categorie_tri, nom, id{', ' + colonnes if colonnes else ''}
+                FROM recettes_marmiton
+                {where}
+                ORDER BY categorie_tri, nom, id
+                LIMIT ?
+            ''', parametres)
+            return [(row[:3], row[3:]) for row in cursor.fetchall()]
+    
+    def _calculer_quantite(self, quantite_base, unite, ratio):
+        """Quantité mise à l'échelle et arrondie intelligemment selon l'unité"""
+        quantite_finale = mettre_a_echelle(quantite_base, unite, ratio)
+        quantite_display = formater_quantite(quantite_finale, unite)
+        
+        return quantite_finale, quantite_display
     
     def get_ingredients_recette(self, recette_id, nb_personnes=2.5):
         """Récupère les ingrédients d'une recette calculés pour nb_personnes"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Récupérer la recette et ses portions de base
-        cursor.execute('SELECT nom, portions FROM recettes_marmiton WHERE id = ?', (recette_id,))
-        recette_info = cursor.fetchone()
-        if not recette_info:
-            return None, []
-        
-        nom_recette, portions_base = recette_info
+        return self.get_ingredients_recettes([recette_id], nb_personnes).get(recette_id, (None, []))
+    
+    def get_ingredients_recettes(self, recettes_ids, nb_personnes=2.5):
+        """Récupère en une seule requête les ingrédients de plusieurs recettes
         
-        # Calculer le ratio
-        ratio = nb_personnes / portions_base
+        Retourne {recette_id: (nom_recette, ingredients)} pour les recettes trouvées.
+        Les résultats viennent du cache LRU quand c'est possible : ne pas les modifier.
+        """
+        resultats = {}
+        ids_manquants = []
+        with connexion(self.db_path) as conn:
+            version = lire_version(conn, 'catalogue')
+            self.cache_ingredients.valider_version(version)
+            
+            for recette_id in dict.fromkeys(recettes_ids):
+                resultat = self.cache_ingredients.get((recette_id, nb_personnes))
+                if resultat is ABSENT:
+                    ids_manquants.append(recette_id)
+                elif resultat[0] is not None:
+                    resultats[recette_id] = resultat
+            
+            if ids_manquants:
+                resultats.update(self._charger_ingredients_recettes(conn, ids_manquants, nb_personnes, version))
         
-        # Récupérer les ingrédients
-        cursor.execute('''
-            SELECT ingredient_nom, quantite_base, unite, rayon
-            FROM ingredients_par_personne 
-            WHERE recette_id = ?
-        ''', (recette_id,))
+        return resultats
+    
+    def _charger_ingredients_recettes(self, conn, recettes_ids, nb_personnes, version):
+        """Requête groupée pour les recettes absentes du cache, puis mise en cache"""
+        placeholders = ', '.join('?' * len(recettes_ids))
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT r.id, r.nom, r.portions, i.ingredient_nom, i.quantite_base, i.unite, i.rayon
+            FROM recettes_marmiton r
+            LEFT JOIN ingredients_par_personne i ON i.recette_id = r.id
+            WHERE r.id IN ({placeholders})
+            ORDER BY r.id, i.id
+        ''', recettes_ids)
         
-        ingredients = []
-        for row in cursor.fetchall():
-            nom, quantite_base, unite, rayon = row
-            quantite_calculee = quantite_base * ratio
+        resultats = {}
+        for recette_id, nom_recette, portions_base, nom, quantite_base, unite, rayon in cursor.fetchall():
+            if recette_id not in resultats:
+                resultats[recette_id] = (nom_recette, [])
+            if nom is None:
+                continue  # Recette sans ingrédients (LEFT JOIN)
             
-            # Arrondir intelligemment selon l'unité
-            if unite == 'pièce' or unite == 'pièces':
-                quantite_finale = max(1, round(quantite_calculee))
-                quantite_display = f"{int(quantite_finale)} {unite}"
-            elif unite in ['gousse', 'gousses', 'feuilles']:
-                quantite_finale = max(1, round(quantite_calculee))
-                quantite_display = f"{int(quantite_finale)} {unite}"
-            elif unite in ['c.s.', 'c.c.']:
-                quantite_finale = round(quantite_calculee, 1)
-                quantite_display = f"{quantite_finale} {unite}"
-            else:
-                quantite_finale = round(quantite_calculee)
-                quantite_display = f"{int(quantite_finale)}{unite}"
+            # Calculer le ratio puis arrondir selon l'unité
+            ratio = nb_personnes / portions_base
+            quantite_finale, quantite_display = self._calculer_quantite(quantite_base, unite, ratio)
             
-            ingredients.append({
+            resultats[recette_id][1].append({
                 'nom': nom,
                 'quantite': quantite_finale,
                 'quantite_display': quantite_display,
@@ -96,114 +203,288 @@ class AssistantCoursesMarmiton:
                 'rayon': rayon
             })
         
-        conn.close()
-        return nom_recette, ingredients
+        # Les recettes introuvables sont aussi mémorisées (None) jusqu'au prochain changement
+        for recette_id in recettes_ids:
+            self.cache_ingredients.set((recette_id, nb_personnes), resultats.get(recette_id, (None, [])), version)
+        
+        return resultats
     
     def generer_liste_courses_complete(self, recettes_selectionnees, nb_personnes=2.5, stock_existant=None):
-        """Génère une liste de courses complète pour plusieurs recettes"""
+        """Génère une liste de courses complète pour plusieurs recettes (mise en cache)"""
         if stock_existant is None:
             stock_existant = {}
         
-        # Collecter tous les ingrédients
-        tous_ingredients = {}
-        recettes_noms = []
+        version = self.version_catalogue()
+        self.cache_listes.valider_version(version)
         
-        for recette_id in recettes_selectionnees:
-            nom_recette, ingredients = self.get_ingredients_recette(recette_id, nb_personnes)
-            if nom_recette:
-                recettes_noms.append(nom_recette)
-                
-                for ingredient in ingredients:
-                    nom = ingredient['nom']
-                    if nom in tous_ingredients:
-                        # Additionner les quantités
-                        tous_ingredients[nom]['quantite'] += ingredient['quantite']
-                    else:
-                        tous_ingredients[nom] = ingredient.copy()
-        
-        # Recalculer les quantités display après addition
-        for nom, ingredient in tous_ingredients.items():
-            unite = ingredient['unite']
-            quantite = ingredient['quantite']
-            
-            if unite in ['pièce', 'pièces', 'gousse', 'gousses', 'feuilles']:
-                ingredient['quantite_display'] = f"{int(quantite)} {unite}"
-            elif unite in ['c.s.', 'c.c.']:
-                ingredient['quantite_display'] = f"{round(quantite, 1)} {unite}"
-            else:
-                ingredient['quantite_display'] = f"{int(quantite)}{unite}"
-        
-        # Filtrer selon le stock existant
-        liste_finale = {}
-        total_articles = 0
-        
-        for nom, ingredient in tous_ingredients.items():
-            if not stock_existant.get(nom, False):  # Si pas en stock
-                rayon = ingredient['rayon']
-                if rayon not in liste_finale:
-                    liste_finale[rayon] = []
-                
-                liste_finale[rayon].append({
-                    'nom': nom,
-                    'quantite': ingredient['quantite_display'],
-                    'rayon': rayon
-                })
-                total_articles += 1
-        
-        # Trier les rayons dans un ordre logique
-        ordre_rayons = [
-            'Fruits', 'Légumes', 'Viande', 'Poisson', 'Charcuterie',
-            'Frais', 'Fromage', 'Pâtes', 'Épicerie', 'Surgelés',
-            'Boulangerie', 'Pâtisserie', 'Huiles', 'Épices', 'Herbes',
-            'Épicerie Asiatique', 'Épicerie Exotique', 'Conserves', 'Alcools'
-        ]
-        
-        liste_ordonnee = {}
-        for rayon in ordre_rayons:
-            if rayon in liste_finale:
-                liste_ordonnee[rayon] = sorted(liste_finale[rayon], key=lambda x: x['nom'])
-        
-        # Ajouter rayons restants
-        for rayon, articles in liste_finale.items():
-            if rayon not in liste_ordonnee:
-                liste_ordonnee[rayon] = sorted(articles, key=lambda x: x['nom'])
+        # Clé canonique : recettes triées (doublons conservés, ils doublent les quantités)
+        # et seuls les ingrédients déclarés en stock comptent
+        en_stock = sorted(nom for nom, present in stock_existant.items() if present)
+        cle = cle_canonique(sorted(recettes_selectionnees), nb_personnes, en_stock)
+        liste = self.cache_listes.get(cle)
+        if liste is ABSENT:
+            liste = self._calculer_liste_courses(sorted(recettes_selectionnees), nb_personnes, stock_existant)
+            self.cache_listes.set(cle, liste, version)
         
+        # Champs propres à la requête : noms dans l'ordre demandé, stock tel que reçu
+        noms = liste['noms_recettes']
         return {
-            'recettes': recettes_noms,
+            'recettes': [noms[recette_id] for recette_id in recettes_selectionnees if recette_id in noms],
             'nb_personnes': nb_personnes,
-            'liste_par_rayon': liste_ordonnee,
-            'total_articles': total_articles,
+            'liste_par_rayon': liste['liste_par_rayon'],
+            'total_articles': liste['total_articles'],
             'stock_utilise': stock_existant
         }
+    
+    def _calculer_liste_courses(self, recettes_selectionnees, nb_personnes, stock_existant):
+        # Une seule requête quel que soit le nombre de recettes
+        ingredients_par_recette = self.get_ingredients_recettes(recettes_selectionnees, nb_personnes)
+        
+        noms_recettes = {}
+        ingredients = []
+        for recette_id in recettes_selectionnees:
+            nom_recette, ingredients_recette = ingredients_par_recette.get(recette_id, (None, []))
+            if nom_recette:
+                noms_recettes[recette_id] = nom_recette
+                ingredients.extend(
+                    (ingredient['nom'], ingredient['quantite'], ingredient['unite'], ingredient['rayon'])
+                    for ingredient in ingredients_recette
+                )
+        
+        liste_par_rayon, total_articles = construire_liste(ingredients, stock_existant, self.index_produits.position_rayon)
+        
+        return {
+            'noms_recettes': noms_recettes,
+            'liste_par_rayon': liste_par_rayon,
+            'total_articles': total_articles
+        }
+    
+    def matrice_ingredients(self):
+        """Matrice de tout le catalogue pour les calculs en lot, rechargée quand le catalogue change"""
+        version = self.version_catalogue()
+        matrice = self._matrice
+        if matrice is None or matrice.version != version:
+            with self._matrice_lock:
+                matrice = self._matrice
+                if matrice is None or matrice.version != version:
+                    with connexion(self.db_path) as conn:
+                        matrice = MatriceIngredients.charger(conn, self.index_produits, version)
+                    self._matrice = matrice
+        return matrice
+    
+    def matrice_stock(self):
+        """Incidence recettes × ingrédients (Marmiton + recettes enrichies), reconstruite si une source change"""
+        matrice_ingredients = self.matrice_ingredients()
+        catalogue = obtenir_catalogue()
+        version = (matrice_ingredients.version, catalogue.version)
+        
+        matrice = self._matrice_stock
+        if matrice is None or matrice.version != version:
+            with self._matrice_lock:
+                matrice = self._matrice_stock
+                if matrice is None or matrice.version != version:
+                    recettes = [
+                        (recette_id, nom, 'marmiton', [ingredient[0] for ingredient in ingredients])
+                        for recette_id, (nom, _, ingredients) in matrice_ingredients.recettes.items()
+                    ]
+                    recettes.extend(
+                        (recette_id, recette.get('nom', recette_id), 'enrichie', recette.get('ingredients', []))
+                        for recette_id, recette in catalogue.toutes_recettes.items()
+                        if isinstance(recette.get('ingredients'), list)
+                    )
+                    matrice = MatriceStock(recettes, self.index_produits, version)
+                    self._matrice_stock = matrice
+        return matrice
+    
+    def index_recherche(self):
+        """Index plein texte du catalogue, reconstruit quand le catalogue change"""
+        version = self.version_catalogue()
+        index = self._index_recherche
+        if index is None or index.version != version:
+            with self._matrice_lock:
+                index = self._index_recherche
+                if index is None or index.version != version:
+                    with connexion(self.db_path) as conn:
+                        index = IndexRecherche.charger(conn, version)
+                    self._index_recherche = index
+        return index
+    
+    def ingredients_en_stock(self):
+        """Ingrédients de stock_maison disponibles (même règle que la vérification du stock : ni bas ni vide)"""
+        with connexion(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT ingredient FROM stock_maison
+                WHERE COALESCE(niveau_stock, 'moyen') NOT IN ('bas', 'vide')
+            ''')
+            return [row[0] for row in cursor.fetchall()]
+
+# Instance du processus, créée par create_app() (une par worker gunicorn)
+assistant = None
+
+def initialiser_donnees():
+    """Schéma et snapshot du catalogue (une fois, avant les workers)"""
+    obtenir_catalogue()
+    with connexion(DB_PATH) as conn:
+        appliquer_migrations(conn)
+
+def create_app():
+    """Point d'entrée WSGI : gunicorn -c gunicorn.conf.py
+    
+    Les caches de chaque worker sont validés par les compteurs de versions_donnees
+    (catalogue, stock) : une écriture dans un worker invalide les caches de tous.
+    """
+    global assistant
+    if assistant is None:
+        assistant = AssistantCoursesMarmiton(initialiser_donnees=os.environ.get('ASSISTANT_DONNEES_INITIALISEES') != '1')
+    return app
 
-# Instance globale
-assistant = AssistantCoursesMarmiton()
+def entree_catalogue(cle, construire):
+    """(corps JSON, ETag, Last-Modified) gardés en mémoire par version du catalogue
+    
+    construire() retourne les données à sérialiser, ou None si la ressource n'existe
+    pas (entree_catalogue retourne alors None). Sans contexte de requête : app_async
+    l'appelle depuis son pool de threads.
+    """
+    version = assistant.version_catalogue()
+    assistant.cache_reponses.valider_version(version)
+    
+    entree = assistant.cache_reponses.get(cle)
+    if entree is ABSENT:
+        donnees = construire()
+        if donnees is None:
+            return None
+        corps = (app.json.dumps(donnees, separators=(',', ':')) + '\n').encode()  # Même corps que jsonify
+        etag = hashlib.sha1(corps).hexdigest()
+        entree = (corps, etag, datetime.now(timezone.utc).replace(microsecond=0))
+        assistant.cache_reponses.set(cle, entree, version)
+    return entree
+
+def reponse_catalogue(cle, construire):
+    """Réponse JSON avec GET conditionnel (ETag / Last-Modified)
+    
+    Une requête répétée ne repasse ni par SQLite ni par la sérialisation, et
+    renvoie 304 si le client possède déjà cette version. None si la ressource
+    n'existe pas.
+    """
+    entree = entree_catalogue(cle, construire)
+    if entree is None:
+        return None
+    
+    corps, etag, derniere_modif = entree
+    reponse = app.response_class(corps, mimetype='application/json')
+    reponse.set_etag(etag)
+    reponse.last_modified = derniere_modif
+    reponse.cache_control.no_cache = True  # Toujours revalider, le 304 coûte presque rien
+    return reponse.make_conditional(request)
 
 # Routes Flask
 @app.route('/')
 def index():
     return render_template('final.html')
 
+def encoder_curseur(cle_tri):
+    return base64.urlsafe_b64encode(json.dumps(list(cle_tri), ensure_ascii=False).encode()).decode()
+
+def decoder_curseur(curseur):
+    """(categorie_tri, nom, id) depuis un curseur opaque, None s'il est invalide"""
+    try:
+        categorie, nom, recette_id = json.loads(base64.urlsafe_b64decode(curseur.encode()))
+        return categorie or '', nom, int(recette_id)  # Curseurs émis avant la migration 9 : null
+    except (ValueError, TypeError):
+        return None
+
 @app.route('/api/recettes')
 def get_recettes():
-    """API pour récupérer toutes les recettes"""
-    recettes = assistant.get_toutes_recettes()
-    return jsonify(recettes)
+    """API pour récupérer les recettes
+    
+    Sans paramètre : catalogue complet (format historique). Avec limite, curseur,
+    categorie, difficulte, temps_max ou fields : page filtrée, champs choisis,
+    réponse envoyée en flux {"recettes": [...], "nombre": n, "curseur_suivant": ...}.
+    """
+    if not PARAMETRES_PAGINATION & request.args.keys():
+        return reponse_catalogue(('recettes',), assistant.get_toutes_recettes)
+    
+    champs = request.args.get('fields')
+    champs = [champ.strip() for champ in champs.split(',') if champ.strip()] if champs else list(CHAMPS_RECETTES)
+    inconnus = [champ for champ in champs if champ not in CHAMPS_RECETTES]
+    if inconnus:
+        return jsonify({'error': f"Champs inconnus : {', '.join(inconnus)}"}), 400
+    
+    apres = None
+    if request.args.get('curseur'):
+        apres = decoder_curseur(request.args['curseur'])
+        if apres is None:
+            return jsonify({'error': 'Curseur invalide'}), 400
+    
+    limite = min(max(request.args.get('limite', LIMITE_PAGE_RECETTES, type=int), 1), LIMITE_PAGE_RECETTES_MAX)
+    lignes = assistant.page_recettes(
+        champs,
+        categorie=request.args.get('categorie'),
+        difficulte=request.args.get('difficulte'),
+        temps_max=request.args.get('temps_max', type=int),
+        apres=apres,
+        limite=limite
+    )
+    
+    def generer():
+        yield '{"recettes": ['
+        nombre = 0
+        curseur_suivant = None
+        derniere_cle = None
+        for cle_tri, valeurs in lignes:
+            if nombre == limite:
+                curseur_suivant = encoder_curseur(derniere_cle)  # Une recette de plus : page suivante
+                break
+            yield (', ' if nombre else '') + json.dumps(dict(zip(champs, valeurs)), ensure_ascii=False)
+            derniere_cle = cle_tri
+            nombre += 1
+        yield f'], "nombre": {nombre}, "curseur_suivant": {json.dumps(curseur_suivant)}}}'
+    
+    return app.response_class(generer(), mimetype='application/json')
+
+@app.route('/api/recherche')
+def rechercher_recettes():
+    """API de recherche plein texte (nom, description, catégorie, ingrédients), paginée"""
+    requete = request.args.get('q', '').strip()
+    if not requete:
+        return jsonify({'error': 'Paramètre q requis'}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    par_page = min(max(request.args.get('par_page', 20, type=int), 1), 100)
+    
+    return reponse_catalogue(
+        ('recherche', requete.lower(), page, par_page),
+        lambda: assistant.index_recherche().rechercher(requete, page, par_page)
+    )
 
 @app.route('/api/ingredients/<int:recette_id>')
 def get_ingredients(recette_id):
     """API pour récupérer les ingrédients d'une recette"""
     nb_personnes = request.args.get('personnes', 2.5, type=float)
-    nom_recette, ingredients = assistant.get_ingredients_recette(recette_id, nb_personnes)
     
-    if nom_recette:
-        return jsonify({
+    def construire():
+        nom_recette, ingredients = assistant.get_ingredients_recette(recette_id, nb_personnes)
+        if not nom_recette:
+            return None
+        return {
             'nom': nom_recette,
             'nb_personnes': nb_personnes,
             'ingredients': ingredients
-        })
-    else:
+        }
+    
+    reponse = reponse_catalogue(('ingredients', recette_id, nb_personnes), construire)
+    if reponse is None:
         return jsonify({'error': 'Recette non trouvée'}), 404
+    return reponse
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """API pour suivre l'efficacité du cache des ingrédients"""
+    return jsonify({
+        'ingredients': assistant.cache_ingredients.stats(),
+        'reponses': assistant.cache_reponses.stats(),
+        'listes': assistant.cache_listes.stats()
+    })
 
 @app.route('/api/liste-courses-finale', methods=['POST'])
 def generer_liste_finale():
@@ -222,7 +503,52 @@ def generer_liste_finale():
         stock_existant
     )
     
-    return jsonify(liste)
+    return reponse_json_ordonnee(app, liste)
+
+@app.route('/api/listes-courses/lot', methods=['POST'])
+def generer_listes_lot():
+    """API pour générer en une fois les listes de plusieurs foyers
+    
+    Corps : {"listes": [{"foyer": ..., "recettes": [...], "personnes": 2.5, "stock": {...}}, ...]}
+    Au plus LISTES_PAR_REQUETE_MAX listes, calculées dans le worker ; au-delà, listes_courses.py hors ligne.
+    """
+    travaux = request.json.get('listes', [])
+    if not isinstance(travaux, list):
+        return jsonify({'error': 'listes doit être une liste'}), 400
+    if len(travaux) > LISTES_PAR_REQUETE_MAX:
+        return jsonify({
+            'error': f"{len(travaux)} listes : {LISTES_PAR_REQUETE_MAX} au plus par requête, "
+                     "utiliser python3 listes_courses.py travaux.json pour les gros lots"
+        }), 413
+    for rang, travail in enumerate(travaux):
+        try:
+            valider_travail(travail)
+        except TravailInvalide as e:
+            return jsonify({'error': f"Liste {rang} : {e}"}), 400
+    
+    debut = time.perf_counter()
+    listes = assistant.matrice_ingredients().calculer_lot(travaux)
+    
+    return reponse_json_ordonnee(app, {
+        'listes': listes,
+        'nb_listes': len(listes),
+        'duree_ms': round((time.perf_counter() - debut) * 1000, 1)
+    })
+
+@app.route('/api/recettes-avec-stock')
+def get_recettes_avec_stock():
+    """API « que cuisiner avec mon stock » : recettes qui utilisent le plus stock_maison"""
+    limite = min(max(request.args.get('limite', 10, type=int), 1), 100)
+    
+    debut = time.perf_counter()
+    en_stock = assistant.ingredients_en_stock()
+    recettes = assistant.matrice_stock().recettes_avec_stock(en_stock, limite)
+    
+    return jsonify({
+        'recettes': recettes,
+        'ingredients_en_stock': len(en_stock),
+        'duree_ms': round((time.perf_counter() - debut) * 1000, 2)
+    })
 
 @app.route('/api/export-whatsapp', methods=['POST'])
 def export_whatsapp():
@@ -252,4 +578,4 @@ def export_whatsapp():
     })
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Accès partagé à la base SQLite
+Pool borné de connexions réutilisées entre requêtes (WAL, synchronous=NORMAL, busy timeout)
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+TAILLE_POOL = int(os.environ.get('ASSISTANT_TAILLE_POOL', 8))
+BUSY_TIMEOUT_MS = 5000
+ATTENTE_POOL = 30  # secondes avant d'abandonner si toutes les connexions sont prises
+
+
+class PoolConnexions:
+    """Pool borné de connexions SQLite
+
+    Un thread qui détient déjà une connexion la réutilise pour les appels
+    imbriqués : une requête Flask n'emprunte qu'une seule connexion et le
+    commit a lieu à la sortie du bloc le plus externe.
+    """
+
+    def __init__(self, db_path, taille_max=TAILLE_POOL):
+        self.db_path = db_path
+        self.taille_max = taille_max
+        self._libres = queue.LifoQueue()
+        self._nb_ouvertes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _ouvrir(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        return conn
+
+    def _emprunter(self):
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            peut_ouvrir = self._nb_ouvertes < self.taille_max
+            if peut_ouvrir:
+                self._nb_ouvertes += 1
+
+        if peut_ouvrir:
+            try:
+                return self._ouvrir()
+            except Exception:
+                with self._lock:
+                    self._nb_ouvertes -= 1
+                raise
+
+        try:
+            return self._libres.get(timeout=ATTENTE_POOL)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"Pool de connexions saturé ({self.taille_max} connexions)")
+
+    @contextmanager
+    def connexion(self):
+        """Connexion du pool : commit en sortie, rollback en cas d'erreur"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Appel imbriqué dans le même thread : même connexion, même transaction
+            yield conn
+            return
+
+        conn = self._emprunter()
+        self._local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._libres.put(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtenir_pool(db_path):
+    """Pool associé à un fichier de base (créé au premier appel)"""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(db_path, PoolConnexions(db_path))
+    return pool
+
+
+def _reinitialiser_apres_fork():
+    """Processus enfant (worker gunicorn) : les connexions du parent ne sont jamais réutilisées"""
+    global _pools, _pools_lock
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinitialiser_apres_fork)
+
+
+def connexion(db_path):
+    """Raccourci : with connexion(DB_PATH) as conn: ..."""
+    return obtenir_pool(db_path).connexion()
+
+
+def lire_version(conn, nom):
+    """Compteur versions_donnees.<nom>, incrémenté par triggers à chaque écriture"""
+    row = conn.execute('SELECT version FROM versions_donnees WHERE nom = ?', (nom,)).fetchone()
+    return row[0] if row else 0
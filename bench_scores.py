@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark des moteurs de scoring (Python vs NumPy vs index trié)
+Génère des banques de recettes synthétiques et vérifie que les classements sont identiques
+"""
+
+import random
+import time
+from itertools import islice
+from datetime import datetime, timedelta
+
+from cache_preferences import Preference
+from moteur_scores import MoteurScoresIndex, MoteurScoresPython, MoteurScoresNumpy, np
+
+TYPES = ['plat_principal', 'plats_rapides', 'plat_weekend', 'plat_mijote', 'gestion_restes', 'accompagnement']
+CUISINES = ['french', 'italian', 'fusion', 'asiatique', 'mexicaine']
+DIFFICULTES = ['facile', 'moyen', 'difficile']
+TOP_K = 24  # Candidats consommés par une requête de suggestions (variété comprise)
+HABITUDES = {
+    'semaine': {'type_preferred': ['plats_rapides'], 'temps_autorise': 30},
+    'weekend': {'type_preferred': ['plat_weekend', 'plat_mijote'], 'temps_autorise': 180},
+}
+
+
+def generer_banque(nombre, graine=42):
+    """Recettes et préférences synthétiques (environ 70% de recettes déjà notées)"""
+    rng = random.Random(graine)
+    aujourd_hui = datetime.now()
+
+    recettes = {}
+    preferences = {}
+    for i in range(nombre):
+        recette_id = f"recette_{i}"
+        recettes[recette_id] = {
+            'nom': f"Recette {i}",
+            'type': rng.choice(TYPES),
+            'cuisine': rng.choice(CUISINES),
+            'difficulte': rng.choice(DIFFICULTES),
+            'temps_prep': rng.choice([10, 15, 20, 30, 45, 60, 120]),
+            'portions': 4,
+            'score_base': rng.randint(0, 10),
+        }
+
+        if rng.random() < 0.7:
+            derniere_prep = None
+            if rng.random() < 0.5:
+                derniere_prep = (aujourd_hui - timedelta(days=rng.randint(0, 60))).strftime('%Y-%m-%d')
+            preferences[recette_id] = Preference(rng.randint(0, 10), rng.randint(0, 5), derniere_prep, 0)
+
+    return recettes, preferences
+
+
+def chronometrer(fonction, repetitions=5):
+    """Meilleur temps sur plusieurs répétitions (en ms)"""
+    meilleur = float('inf')
+    resultat = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur * 1000, resultat
+
+
+def comparer(nombre):
+    recettes, preferences = generer_banque(nombre)
+    maintenant = datetime.now()
+
+    construction_py, moteur_py = chronometrer(lambda: MoteurScoresPython(recettes, preferences), 1)
+    construction_np, moteur_np = chronometrer(lambda: MoteurScoresNumpy(recettes, preferences), 1)
+    construction_ix, moteur_ix = chronometrer(lambda: MoteurScoresIndex(recettes, preferences), 1)
+
+    print(f"📦 {nombre:,} recettes")
+    print(f"   Construction : python {construction_py:8.1f} ms | numpy {construction_np:8.1f} ms"
+          f" | index {construction_ix:8.1f} ms")
+
+    for contexte, habitudes in HABITUDES.items():
+        temps_py, classement_py = chronometrer(lambda: moteur_py.classer(habitudes, maintenant))
+        temps_np, classement_np = chronometrer(lambda: moteur_np.classer(habitudes, maintenant))
+
+        identique = classement_py == classement_np
+        print(f"   {contexte:8s} : python {temps_py:8.1f} ms | numpy {temps_np:8.1f} ms"
+              f" | x{temps_py / temps_np:5.1f} | classement {'identique ✅' if identique else 'DIFFÉRENT ❌'}")
+
+        temps_ix, top_ix = chronometrer(lambda: list(islice(moteur_ix.parcourir(habitudes, maintenant), TOP_K)))
+        identique = top_ix == classement_py[:TOP_K] and moteur_ix.classer(habitudes, maintenant) == classement_py
+        print(f"   {contexte:8s} : top {TOP_K} index {temps_ix:8.2f} ms"
+              f" | x{temps_py / temps_ix:7.1f} | classement {'identique ✅' if identique else 'DIFFÉRENT ❌'}")
+
+    # Mise à jour incrémentale de l'index après un choix
+    recette_id = next(iter(recettes))
+    preferences[recette_id] = Preference(50, 0, None, 0)
+    temps_maj, _ = chronometrer(lambda: moteur_ix.mettre_a_jour(recette_id, preferences[recette_id]), 1)
+    moteur_py = MoteurScoresPython(recettes, preferences)
+    habitudes = HABITUDES['semaine']
+    identique = moteur_ix.classer(habitudes, maintenant) == moteur_py.classer(habitudes, maintenant)
+    print(f"   Mise à jour index : {temps_maj:6.2f} ms | classement {'identique ✅' if identique else 'DIFFÉRENT ❌'}")
+
+
+if __name__ == "__main__":
+    if np is None:
+        raise SystemExit("❌ NumPy n'est pas installé (pip install numpy)")
+
+    print("⏱️ Benchmark moteurs de scoring")
+    print("═" * 50)
+    for nombre in (10_000, 100_000):
+        comparer(nombre)
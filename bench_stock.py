@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la matrice recettes × ingrédients (« que cuisiner avec mon stock »)
+Génère un catalogue synthétique et mesure une requête de bout en bout
+"""
+
+import random
+import time
+
+from matrice_stock import MatriceStock, csr_matrix, np
+
+NB_INGREDIENTS = 2_000
+TAILLE_STOCK = 40
+
+
+def generer_catalogue(nombre, graine=42):
+    """Recettes synthétiques de 4 à 12 ingrédients tirés d'un vocabulaire commun"""
+    rng = random.Random(graine)
+    vocabulaire = [f"ingredient {i}" for i in range(NB_INGREDIENTS)]
+    recettes = [
+        (i, f"Recette {i}", 'synthetique', rng.sample(vocabulaire, rng.randint(4, 12)))
+        for i in range(nombre)
+    ]
+    return recettes, rng.sample(vocabulaire, TAILLE_STOCK)
+
+
+def mesurer(nombre, repetitions=20):
+    recettes, stock = generer_catalogue(nombre)
+
+    debut = time.perf_counter()
+    matrice = MatriceStock(recettes)
+    construction = (time.perf_counter() - debut) * 1000
+
+    meilleur = float('inf')
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultats = matrice.recettes_avec_stock(stock, 10)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+
+    print(f"📦 {nombre:,} recettes : construction {construction:8.1f} ms | requête top 10 {meilleur * 1000:6.2f} ms"
+          f" | meilleure couverture {resultats[0]['couverture']}")
+
+
+if __name__ == "__main__":
+    if np is None:
+        raise SystemExit("❌ NumPy n'est pas installé (pip install numpy)")
+
+    print(f"⏱️ Benchmark matrice stock (produit {'scipy.sparse' if csr_matrix is not None else 'np.bincount'})")
+    print("═" * 50)
+    for nombre in (10_000, 100_000):
+        mesurer(nombre)
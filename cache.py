@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Cache LRU en mémoire avec compteurs hits/misses et durée de vie optionnelle
+Invalidé en bloc quand la version des données source change
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+ABSENT = object()
+
+
+def cle_canonique(*parties):
+    """Empreinte stable d'un ensemble de paramètres (ordre des clés de dict sans effet)"""
+    contenu = json.dumps(parties, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(contenu.encode()).hexdigest()
+
+
+class CacheLRU:
+    def __init__(self, taille_max=256, ttl=None):
+        self.taille_max = taille_max
+        self.ttl = ttl  # Secondes, None = pas d'expiration
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self._entrees = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cle):
+        """Valeur en cache ou ABSENT ; les valeurs sont partagées, ne pas les modifier"""
+        with self._lock:
+            valeur, expiration = self._entrees.get(cle, (ABSENT, None))
+            if expiration is not None and expiration <= time.monotonic():
+                del self._entrees[cle]
+                valeur = ABSENT
+            if valeur is ABSENT:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entrees.move_to_end(cle)
+            return valeur
+
+    def set(self, cle, valeur, version=ABSENT):
+        """Mémorise une valeur, ignorée si elle a été calculée pour une autre version"""
+        with self._lock:
+            if version is not ABSENT and version != self.version:
+                return
+            expiration = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entrees[cle] = (valeur, expiration)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def vider(self):
+        with self._lock:
+            self._entrees.clear()
+
+    def valider_version(self, version):
+        """Vide le cache si la version des données a changé depuis le dernier appel"""
+        if version == self.version:
+            return
+        with self._lock:
+            if version != self.version:
+                self._entrees.clear()
+                self.version = version
+
+    def __len__(self):
+        return len(self._entrees)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'taille': len(self._entrees),
+            'taille_max': self.taille_max,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'taux_hit': round(self.hits / total, 3) if total else 0.0,
+            'version': self.version
+        }
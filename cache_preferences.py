@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Cache mémoire des préférences recettes
+Indexé par recette_id, chargé une fois puis tenu à jour en écriture directe (write-through)
+Les choix (swipes) sont écrits en différé par lots (write-behind)
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+from base_donnees import connexion, lire_version
+
+Preference = namedtuple('Preference', ['choisi', 'refuse', 'date_derniere_preparation', 'frequence_reelle'])
+
+DELAI_ECRITURE_MS = int(os.environ.get('ASSISTANT_DELAI_ECRITURE_MS', 200))
+TAILLE_LOT_ECRITURE = int(os.environ.get('ASSISTANT_TAILLE_LOT_ECRITURE', 50))
+INTERVALLE_SYNCHRO_MS = int(os.environ.get('ASSISTANT_INTERVALLE_SYNCHRO_MS', 500))
+
+
+class FileEcritureChoix:
+    """File d'écriture différée des choix
+
+    Les incréments sont fusionnés par recette_id puis écrits en une seule
+    transaction toutes les DELAI_ECRITURE_MS ou dès TAILLE_LOT_ECRITURE
+    événements. La file est vidée à l'arrêt du processus.
+    apres_ecriture(version_avant, version_apres) reçoit le compteur
+    versions_donnees.preferences lu avant et après chaque lot écrit.
+    """
+
+    def __init__(self, db_path, delai_ms=DELAI_ECRITURE_MS, taille_lot=TAILLE_LOT_ECRITURE, apres_ecriture=None):
+        self.db_path = db_path
+        self.delai = delai_ms / 1000
+        self.taille_lot = taille_lot
+        self.apres_ecriture = apres_ecriture
+        self._en_attente = {}  # recette_id -> {'choisi': n, 'refuse': n, 'date': date}
+        self._nb_evenements = 0
+        self._condition = threading.Condition()
+        self._lock_ecriture = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        atexit.register(self.vider)
+
+    def ajouter(self, recette_id, choix_type):
+        with self._condition:
+            increments = self._en_attente.setdefault(recette_id, {'choisi': 0, 'refuse': 0, 'date': None})
+            increments[choix_type] += 1
+            increments['date'] = datetime.now().date()
+            self._nb_evenements += 1
+            self._condition.notify()
+
+        self._demarrer()
+
+    def __len__(self):
+        return self._nb_evenements
+
+    def _demarrer(self):
+        # Démarrage paresseux : un thread créé avant un fork (gunicorn) n'existe pas dans le worker
+        if self._thread is not None and self._thread_pid == os.getpid():
+            return
+        with self._condition:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=self._boucle, name='ecriture-choix', daemon=True)
+            self._thread.start()
+
+    def _boucle(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._en_attente)
+                # Laisse le lot se remplir pendant le délai, sauf s'il est déjà plein
+                self._condition.wait_for(lambda: self._nb_evenements >= self.taille_lot, timeout=self.delai)
+            self.vider()
+
+    def vider(self):
+        """Écrit les incréments en attente en une transaction"""
+        with self._lock_ecriture:
+            with self._condition:
+                lot, self._en_attente = self._en_attente, {}
+                self._nb_evenements = 0
+            if not lot:
+                return
+
+            try:
+                with connexion(self.db_path) as conn:
+                    # Verrou d'écriture dès la lecture : aucune autre écriture entre avant et après
+                    if not conn.in_transaction:
+                        conn.execute('BEGIN IMMEDIATE')
+                    version_avant = lire_version(conn, 'preferences')
+                    conn.executemany('''
+                        UPDATE preferences_recettes
+                        SET choisi = choisi + ?, refuse = refuse + ?, date_derniere_suggestion = ?
+                        WHERE recette_id = ?
+                    ''', [(inc['choisi'], inc['refuse'], inc['date'], recette_id) for recette_id, inc in lot.items()])
+                    version_apres = lire_version(conn, 'preferences')
+            except Exception as e:
+                print(f"⚠️ Écriture des choix reportée ({len(lot)} recettes): {e}")
+                self._remettre(lot)
+                return
+
+            if self.apres_ecriture:
+                self.apres_ecriture(version_avant, version_apres)
+
+    @contextmanager
+    def suspendre(self):
+        """Bloque l'écriture des lots le temps d'une lecture de la table"""
+        with self._lock_ecriture:
+            yield
+
+    def en_attente(self):
+        """Copie des incréments pas encore écrits en DB"""
+        with self._condition:
+            return {recette_id: dict(inc) for recette_id, inc in self._en_attente.items()}
+
+    def _remettre(self, lot):
+        """Réinsère un lot non écrit, fusionné avec les événements arrivés entre-temps"""
+        with self._condition:
+            for recette_id, inc in lot.items():
+                increments = self._en_attente.setdefault(recette_id, {'choisi': 0, 'refuse': 0, 'date': inc['date']})
+                increments['choisi'] += inc['choisi']
+                increments['refuse'] += inc['refuse']
+                self._nb_evenements += inc['choisi'] + inc['refuse']
+
+
+class CachePreferences:
+    def __init__(self, db_path='data/assistant.db'):
+        self.db_path = db_path
+        self._preferences = {}
+        self._lock = threading.Lock()
+        self._abonnes = []
+        self._nb_choisies = 0
+        self._version = None  # versions_donnees.preferences reflétée par le cache
+        self._prochaine_synchro = 0
+        self._file_choix = FileEcritureChoix(db_path, apres_ecriture=self._ecriture_locale)
+
+    def charger(self, recettes_ids=None):
+        """Charge les préférences depuis la DB : toutes (au démarrage) ou seulement recettes_ids
+
+        Lecture seule : les choix encore en file sont réappliqués aux lignes lues.
+        Les abonnés sont notifiés des préférences qui ont changé depuis le dernier chargement.
+        """
+        # Aucun lot écrit pendant la lecture : un choix est soit dans la table, soit dans la file
+        with self._file_choix.suspendre():
+            with connexion(self.db_path) as conn:
+                version = lire_version(conn, 'preferences')
+                cursor = conn.cursor()
+                requete = '''
+                    SELECT recette_id, choisi, refuse, date_derniere_preparation, frequence_reelle
+                    FROM preferences_recettes
+                '''
+                if recettes_ids is None:
+                    cursor.execute(requete)
+                else:
+                    cursor.execute(requete + ' WHERE recette_id IN (SELECT value FROM json_each(?))', (json.dumps(list(recettes_ids)),))
+
+                # recette_id est UNIQUE (migration 3) : une ligne par recette
+                preferences = {
+                    recette_id: Preference(choisi, refuse, derniere_prep, freq)
+                    for recette_id, choisi, refuse, derniere_prep, freq in cursor.fetchall()
+                }
+
+            with self._lock:
+                for recette_id, inc in self._file_choix.en_attente().items():
+                    pref = preferences.get(recette_id)
+                    if pref:
+                        preferences[recette_id] = pref._replace(
+                            choisi=(pref.choisi or 0) + inc['choisi'],
+                            refuse=(pref.refuse or 0) + inc['refuse']
+                        )
+                anciennes = self._preferences
+                if recettes_ids is not None:
+                    preferences = {**anciennes, **preferences}
+                else:
+                    self._version = version
+                self._preferences = preferences
+                self._nb_choisies = sum(1 for pref in preferences.values() if (pref.choisi or 0) > 0)
+
+        # Une seule notification par rechargement : l'abonné traite le lot en une passe
+        self._notifier({
+            recette_id: pref for recette_id, pref in preferences.items() if anciennes.get(recette_id) != pref
+        })
+
+    def synchroniser(self):
+        """Recharge le cache si preferences_recettes a changé dans un autre worker ou processus
+
+        Au plus une lecture de versions_donnees toutes les INTERVALLE_SYNCHRO_MS ; les
+        écritures de ce processus avancent self._version et ne provoquent pas de rechargement.
+        """
+        maintenant = time.monotonic()
+        if maintenant < self._prochaine_synchro:
+            return
+        self._prochaine_synchro = maintenant + INTERVALLE_SYNCHRO_MS / 1000
+
+        with connexion(self.db_path) as conn:
+            version = lire_version(conn, 'preferences')
+        if version != self._version:
+            self.charger()
+
+    def _ecriture_locale(self, version_avant, version_apres):
+        """Écriture de ce processus, déjà dans le cache : adopte la version qu'elle a produite
+
+        Si une autre écriture la précédait (version_avant inconnue), le cache reste
+        en retard et le prochain synchroniser() recharge.
+        """
+        with self._lock:
+            if self._version == version_avant:
+                self._version = version_apres
+
+    def abonner(self, fonction):
+        """Enregistre fonction({recette_id: preference}) appelée avec les préférences modifiées"""
+        # Copie à l'écriture : _notifier peut parcourir la liste pendant un rechargement
+        self._abonnes = self._abonnes + [fonction]
+
+    def desabonner(self, fonction):
+        self._abonnes = [abonne for abonne in self._abonnes if abonne != fonction]
+
+    def _notifier(self, changements):
+        if not changements:
+            return
+        for fonction in self._abonnes:
+            fonction(changements)
+
+    def get(self, recette_id):
+        """Préférence d'une recette (None si jamais vue) - lecture sans SQLite"""
+        return self._preferences.get(recette_id)
+
+    def __contains__(self, recette_id):
+        return recette_id in self._preferences
+
+    def __len__(self):
+        return len(self._preferences)
+
+    def nombre_recettes_choisies(self):
+        """Nombre de recettes choisies au moins une fois (tenu à jour, sans SQLite)"""
+        return self._nb_choisies
+
+    def enregistrer_choix(self, recette_id, choix_type):
+        """Incrémente choisi/refuse dans le cache tout de suite, en DB au prochain lot"""
+        if choix_type not in ('choisi', 'refuse'):
+            return
+
+        if recette_id not in self._preferences:
+            # Recette ajoutée par un autre worker depuis le dernier rechargement : relire sa ligne
+            self.charger([recette_id])
+
+        with self._lock:
+            pref = self._preferences.get(recette_id)
+            if not pref:
+                return  # Absente de la table aussi : l'UPDATE ne toucherait aucune ligne
+            if choix_type == 'choisi' and (pref.choisi or 0) == 0:
+                self._nb_choisies += 1
+            pref = pref._replace(**{choix_type: (getattr(pref, choix_type) or 0) + 1})
+            self._preferences[recette_id] = pref
+            # Sous le verrou : un rechargement voit le choix dans le cache ou dans la file
+            self._file_choix.ajouter(recette_id, choix_type)
+
+        self._notifier({recette_id: pref})
+
+    def vider_ecritures(self):
+        """Force l'écriture des choix en attente"""
+        self._file_choix.vider()
+
+    def enregistrer_recette(self, recette_id, frequence_reelle):
+        """Ajoute une recette en DB puis dans le cache"""
+        self.enregistrer_recettes([(recette_id, frequence_reelle)])
+
+    def enregistrer_recettes(self, recettes, remplacer_frequence=True):
+        """Ajoute des recettes [(recette_id, frequence_reelle)] en une transaction
+
+        Une recette déjà connue garde ses compteurs appris (choisi, refuse, dernière
+        préparation) : seule sa fréquence est mise à jour, ou rien du tout si
+        remplacer_frequence est faux.
+        """
+        aujourd_hui = datetime.now().date()
+        conflit = 'DO UPDATE SET frequence_reelle = excluded.frequence_reelle' if remplacer_frequence else 'DO NOTHING'
+        if not remplacer_frequence:
+            with self._lock:
+                recettes = [(recette_id, freq) for recette_id, freq in recettes if recette_id not in self._preferences]
+        try:
+            with connexion(self.db_path) as conn:
+                if not conn.in_transaction:
+                    conn.execute('BEGIN IMMEDIATE')
+                version_avant = lire_version(conn, 'preferences')
+                conn.executemany(f'''
+                    INSERT INTO preferences_recettes
+                    (recette_id, choisi, frequence_reelle, date_derniere_suggestion)
+                    VALUES (?, 0, ?, ?)
+                    ON CONFLICT (recette_id) {conflit}
+                ''', [(recette_id, frequence_reelle, aujourd_hui) for recette_id, frequence_reelle in recettes])
+                existantes = {}
+                if not remplacer_frequence:
+                    # Ligne créée par un autre worker : le cache reprend ses valeurs, pas les nôtres
+                    existantes = {
+                        recette_id: Preference(choisi, refuse, derniere_prep, freq)
+                        for recette_id, choisi, refuse, derniere_prep, freq in conn.execute('''
+                            SELECT recette_id, choisi, refuse, date_derniere_preparation, frequence_reelle
+                            FROM preferences_recettes WHERE recette_id IN (SELECT value FROM json_each(?))
+                        ''', (json.dumps([recette_id for recette_id, _ in recettes]),))
+                    }
+                version_apres = lire_version(conn, 'preferences')
+        except Exception as e:
+            print(f"Erreur sauvegarde recettes {[recette_id for recette_id, _ in recettes]}: {e}")
+            return
+
+        modifiees = {}
+        with self._lock:
+            for recette_id, frequence_reelle in recettes:
+                ancienne = self._preferences.get(recette_id)
+                if not remplacer_frequence:
+                    if ancienne:
+                        continue  # Créée entre-temps dans ce processus, laissée intacte
+                    pref = existantes[recette_id]
+                elif ancienne:
+                    pref = ancienne._replace(frequence_reelle=frequence_reelle)
+                else:
+                    pref = Preference(0, 0, None, frequence_reelle)
+                if not ancienne and (pref.choisi or 0) > 0:
+                    self._nb_choisies += 1
+                self._preferences[recette_id] = pref
+                modifiees[recette_id] = pref
+        self._ecriture_locale(version_avant, version_apres)
+
+        self._notifier(modifiees)
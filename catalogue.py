@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Catalogue de recettes et produits Coop
+Compile les sources JSON en un snapshot binaire (pickle) vérifié par empreinte SHA-256
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+from index_produits import IndexProduits
+
+RECETTES_PATH = 'data/recettes.json'
+PRODUITS_PATH = 'data/produits_coop.json'
+RECETTES_ENRICHIES_PATH = 'data/recettes_enrichies.json'
+SNAPSHOT_PATH = 'data/catalogue.pickle'
+
+SOURCES = {
+    'recettes': RECETTES_PATH,
+    'produits': PRODUITS_PATH,
+    'recettes_enrichies': RECETTES_ENRICHIES_PATH,
+}
+SOURCES_OPTIONNELLES = {'recettes_enrichies'}
+FORMAT_SNAPSHOT = 1
+
+
+class Catalogue:
+    """Données de référence chargées une fois et partagées (lecture seule)"""
+
+    def __init__(self, donnees, empreintes, index_produits=None):
+        self.donnees = donnees
+        self.empreintes = empreintes
+        self.recettes = donnees['recettes']
+        self.produits = donnees['produits']
+        self.recettes_enrichies = donnees['recettes_enrichies']
+
+        if self.recettes_enrichies is None:
+            print("⚠️ Fichier recettes enrichies non trouvé, utilisation base standard")
+            self.toutes_recettes = self.recettes.get('recettes_recurrentes', {})
+        else:
+            # Fusionner avec les recettes de base
+            self.toutes_recettes = {}
+            self.toutes_recettes.update(self.recettes_enrichies.get('recettes_base', {}))
+            self.toutes_recettes.update(self.recettes_enrichies.get('banque_recettes', {}))
+
+        # Dérivé, reconstruit à chaque chargement (le snapshot ne contient que les sources)
+        self.index_produits = index_produits if index_produits is not None else IndexProduits(self.produits)
+
+    @property
+    def version(self):
+        """Empreinte globale du contenu (change dès qu'une source change)"""
+        contenu = '|'.join(f"{nom}:{self.empreintes[nom]}" for nom in sorted(self.empreintes))
+        return hashlib.sha256(contenu.encode()).hexdigest()[:16]
+
+
+def calculer_empreintes():
+    """Empreinte SHA-256 de chaque source (None si la source est absente)"""
+    empreintes = {}
+    for nom, chemin in SOURCES.items():
+        try:
+            with open(chemin, 'rb') as f:
+                empreintes[nom] = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            if nom not in SOURCES_OPTIONNELLES:
+                raise
+            empreintes[nom] = None
+    return empreintes
+
+
+def mtimes_sources():
+    """Date de modification de chaque source (détection bon marché des changements)"""
+    mtimes = {}
+    for nom, chemin in SOURCES.items():
+        try:
+            mtimes[nom] = os.stat(chemin).st_mtime_ns
+        except FileNotFoundError:
+            mtimes[nom] = None
+    return mtimes
+
+
+def lire_source(nom):
+    """Parse une source JSON (None si optionnelle et absente)"""
+    try:
+        with open(SOURCES[nom], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        if nom not in SOURCES_OPTIONNELLES:
+            raise
+        return None
+
+
+def lire_sources_json():
+    """Parse les sources JSON (chemin lent)"""
+    return {nom: lire_source(nom) for nom in SOURCES}
+
+
+def compiler_snapshot(chemin=SNAPSHOT_PATH):
+    """Étape de build : compile les sources JSON en snapshot binaire"""
+    empreintes = calculer_empreintes()
+    donnees = lire_sources_json()
+    _ecrire_snapshot(chemin, donnees, empreintes)
+    return Catalogue(donnees, empreintes)
+
+
+def _ecrire_snapshot(chemin, donnees, empreintes):
+    snapshot = {'format': FORMAT_SNAPSHOT, 'empreintes': empreintes, 'donnees': donnees}
+    # Écriture atomique : un lecteur ne voit jamais un fichier à moitié écrit
+    chemin_tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(chemin_tmp, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(chemin_tmp, chemin)
+
+
+def _lire_snapshot(chemin, empreintes):
+    """Données du snapshot s'il est à jour, None sinon"""
+    try:
+        with open(chemin, 'rb') as f:
+            snapshot = pickle.load(f)
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+        return None
+
+    if snapshot.get('format') != FORMAT_SNAPSHOT or snapshot.get('empreintes') != empreintes:
+        return None
+    return snapshot['donnees']
+
+
+def charger_catalogue(chemin_snapshot=SNAPSHOT_PATH):
+    """Charge le catalogue depuis le snapshot s'il est frais, sinon depuis le JSON"""
+    empreintes = calculer_empreintes()
+    donnees = _lire_snapshot(chemin_snapshot, empreintes)
+
+    if donnees is None:
+        donnees = lire_sources_json()
+        try:
+            # Le prochain démarrage profitera du snapshot
+            _ecrire_snapshot(chemin_snapshot, donnees, empreintes)
+        except OSError as e:
+            print(f"⚠️ Snapshot catalogue non écrit: {e}")
+
+    return Catalogue(donnees, empreintes)
+
+
+_catalogue = None
+_catalogue_lock = threading.Lock()
+
+
+def obtenir_catalogue():
+    """Catalogue partagé du processus (chargé au premier appel)"""
+    global _catalogue
+    if _catalogue is None:
+        with _catalogue_lock:
+            if _catalogue is None:
+                _catalogue = charger_catalogue()
+    return _catalogue
+
+
+def recharger_catalogue(actuel, chemin_snapshot=SNAPSHOT_PATH):
+    """Relit seulement les sources modifiées depuis le catalogue actuel
+
+    Retourne (nouveau catalogue, sources modifiées), ou (None, []) si rien n'a changé.
+    Le nouveau catalogue remplace le catalogue partagé du processus ; l'ancien reste
+    intact pour les requêtes qui l'utilisent encore.
+    """
+    global _catalogue
+    empreintes = calculer_empreintes()
+    modifiees = [nom for nom in SOURCES if empreintes[nom] != actuel.empreintes.get(nom)]
+    if not modifiees:
+        return None, []
+
+    donnees = dict(actuel.donnees)
+    for nom in modifiees:
+        donnees[nom] = lire_source(nom)
+
+    # Index produits réutilisé tel quel si produits_coop.json n'a pas changé
+    index_produits = actuel.index_produits if 'produits' not in modifiees else None
+    nouveau = Catalogue(donnees, empreintes, index_produits)
+
+    try:
+        _ecrire_snapshot(chemin_snapshot, donnees, empreintes)
+    except OSError as e:
+        print(f"⚠️ Snapshot catalogue non écrit: {e}")
+
+    with _catalogue_lock:
+        _catalogue = nouveau
+    return nouveau, modifiees
+
+
+def comparer_recettes(ancien, nouveau):
+    """Recettes ajoutées, supprimées et modifiées entre deux catalogues"""
+    def recettes(catalogue):
+        toutes = dict(catalogue.recettes.get('recettes_recurrentes', {}))
+        toutes.update(catalogue.toutes_recettes)
+        return toutes
+
+    avant = recettes(ancien)
+    apres = recettes(nouveau)
+    return {
+        'ajoutees': [recette_id for recette_id in apres if recette_id not in avant],
+        'supprimees': [recette_id for recette_id in avant if recette_id not in apres],
+        'modifiees': [recette_id for recette_id in apres if recette_id in avant and apres[recette_id] != avant[recette_id]],
+    }
+
+
+if __name__ == "__main__":
+    print("📦 Compilation du catalogue...")
+    catalogue = compiler_snapshot()
+    print(f"   {len(catalogue.toutes_recettes)} recettes, {len(catalogue.produits.get('rayons', {}))} rayons")
+    print(f"   Version {catalogue.version} → {SNAPSHOT_PATH}")
+    print("✅ Snapshot catalogue prêt !")
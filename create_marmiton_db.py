@@ -4,9 +4,8 @@ Création base de données avec 50 recettes style Marmiton
 Recettes françaises populaires et faciles à réaliser
 """
 
-import sqlite3
-import json
 from datetime import datetime
+from import_recettes import importer_recettes
 
 def create_marmiton_database():
     """Crée une base de données avec 50 recettes inspirées Marmiton"""
@@ -601,82 +600,8 @@ def create_marmiton_database():
     return recettes_marmiton
 
 def save_to_database(recettes):
-    """Sauvegarde les recettes dans SQLite"""
-    
-    # Supprimer l'ancienne base pour repartir de zéro
-    import os
-    db_path = "data/assistant.db"
-    if os.path.exists(db_path):
-        os.remove(db_path)
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Créer les tables
-    cursor.execute('''
-        CREATE TABLE recettes_marmiton (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nom TEXT UNIQUE NOT NULL,
-            categorie TEXT,
-            difficulte TEXT,
-            temps_prep INTEGER,
-            temps_cuisson INTEGER,
-            portions INTEGER,
-            description TEXT,
-            ingredients_json TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE ingredients_par_personne (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            recette_id INTEGER,
-            ingredient_nom TEXT,
-            quantite_base REAL,
-            unite TEXT,
-            rayon TEXT,
-            FOREIGN KEY (recette_id) REFERENCES recettes_marmiton (id)
-        )
-    ''')
-    
-    # Insérer les recettes
-    for recette in recettes:
-        cursor.execute('''
-            INSERT INTO recettes_marmiton 
-            (nom, categorie, difficulte, temps_prep, temps_cuisson, portions, description, ingredients_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            recette['nom'],
-            recette['categorie'],
-            recette['difficulte'],
-            recette['temps_prep'],
-            recette['temps_cuisson'],
-            recette['portions'],
-            recette['description'],
-            json.dumps(recette['ingredients'])
-        ))
-        
-        recette_id = cursor.lastrowid
-        
-        # Insérer les ingrédients détaillés
-        for ingredient_nom, details in recette['ingredients'].items():
-            cursor.execute('''
-                INSERT INTO ingredients_par_personne
-                (recette_id, ingredient_nom, quantite_base, unite, rayon)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                recette_id,
-                ingredient_nom,
-                details['quantite'],
-                details['unite'],
-                details['rayon']
-            ))
-    
-    conn.commit()
-    conn.close()
-    
-    return len(recettes)
+    """Remplace le catalogue SQLite par ces recettes (import en masse, préférences et stock conservés)"""
+    return importer_recettes(recettes, "data/assistant.db", remplacer=True).recettes
 
 if __name__ == "__main__":
     print("🍽️ Création de la base Marmiton...")
@@ -4,26 +4,49 @@ Générateur IA de Nouvelles Recettes
 Crée de nouvelles recettes basées sur les préférences de Michael
 """
 
-import json
+import os
+import queue
 import random
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
-import sqlite3
+from base_donnees import connexion
+from cache_preferences import CachePreferences
+from catalogue import obtenir_catalogue
+
+TAILLE_RESERVE = 6  # Recettes pré-générées par contexte
+MAX_CONTEXTES_RESERVE = 32  # Le contexte est libre (paramètre d'URL) : nombre de réserves borné
+INTERVALLE_MAINTENANCE = 3600  # Secondes minimum entre deux enrichissements automatiques de la banque
 
 class GenerateurRecettes:
-    def __init__(self, db_path='data/assistant.db'):
+    def __init__(self, db_path='data/assistant.db', preferences=None, catalogue=None):
         self.db_path = db_path
+        self.catalogue = catalogue
+        # Cache partagé avec l'assistant pour que les ajouts soient visibles au scoring
+        self.preferences = preferences if preferences is not None else CachePreferences(db_path)
         self.charger_patterns()
         self.cuisines_preferees = ['french', 'italian', 'fusion']
         self.niveau_famille = 'facile_moyen'  # Adapté famille avec enfants
         
+        # Réserves de recettes pré-générées par contexte (weekend, contexte)
+        self._reserves = OrderedDict()
+        self._reserves_lock = threading.Lock()
+        self._en_attente = set()
+        self._taches = queue.Queue()
+        self._producteur = None
+        self._producteur_pid = None
+        self._derniere_maintenance = float('-inf')
+        
     def charger_patterns(self):
         """Charge les patterns de génération"""
-        try:
-            with open('data/recettes_enrichies.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.patterns = data.get('generateur_patterns', {})
-                self.banque_recettes = data.get('banque_recettes', {})
-        except:
+        # Catalogue partagé avec l'assistant : recettes_enrichies.json n'est lu qu'une fois
+        catalogue = self.catalogue if self.catalogue is not None else obtenir_catalogue()
+        data = catalogue.recettes_enrichies
+        if data is not None:
+            self.patterns = data.get('generateur_patterns', {})
+            self.banque_recettes = data.get('banque_recettes', {})
+        else:
             # Patterns de base si fichier manquant
             self.patterns = {
                 "cuisines": ["french", "italian", "fusion"],
@@ -40,9 +63,6 @@ class GenerateurRecettes:
     
     def analyser_preferences(self):
         """Analyse les préférences actuelles depuis la DB"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         preferences = {
             'cuisines_aimees': [],
             'temps_prefere': 30,
@@ -50,35 +70,37 @@ class GenerateurRecettes:
             'ingredients_favoris': [],
             'types_preferes': []
         }
-        
-        try:
-            # Analyser les recettes souvent choisies
-            cursor.execute('''
-                SELECT recette_id, choisi FROM preferences_recettes 
-                WHERE choisi > refuse ORDER BY choisi DESC LIMIT 5
-            ''')
-            
-            recettes_populaires = cursor.fetchall()
-            
-            # Analyser les patterns des recettes aimées
-            # (Pour l'instant on utilise des valeurs par défaut)
-            preferences['cuisines_aimees'] = ['french', 'italian', 'fusion']
-            preferences['temps_prefere'] = random.choice([20, 25, 30, 35])
-            preferences['difficulte_preferee'] = random.choice(['facile', 'moyen'])
-            
-        except Exception as e:
-            print(f"Erreur analyse preferences: {e}")
-        
-        conn.close()
+
+        with connexion(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            try:
+                # Analyser les recettes souvent choisies
+                cursor.execute('''
+                    SELECT recette_id, choisi FROM preferences_recettes 
+                    WHERE choisi > refuse ORDER BY choisi DESC LIMIT 5
+                ''')
+                
+                recettes_populaires = cursor.fetchall()
+                
+                # Analyser les patterns des recettes aimées
+                # (Pour l'instant on utilise des valeurs par défaut)
+                preferences['cuisines_aimees'] = ['french', 'italian', 'fusion']
+                preferences['temps_prefere'] = random.choice([20, 25, 30, 35])
+                preferences['difficulte_preferee'] = random.choice(['facile', 'moyen'])
+                
+            except Exception as e:
+                print(f"Erreur analyse preferences: {e}")
         return preferences
     
-    def generer_recette_contextuelle(self, contexte=""):
+    def generer_recette_contextuelle(self, contexte="", preferences=None, is_weekend=None):
         """Génère une recette selon le contexte actuel"""
-        preferences = self.analyser_preferences()
+        if preferences is None:
+            preferences = self.analyser_preferences()
         
         # Analyser le contexte pour adapter la génération
-        jour_semaine = datetime.now().weekday()
-        is_weekend = jour_semaine >= 5
+        if is_weekend is None:
+            is_weekend = self._est_weekend()
         
         # Sélection intelligente des paramètres
         if is_weekend:
@@ -100,6 +122,91 @@ class GenerateurRecettes:
         
         return nouvelle_recette
     
+    def _est_weekend(self):
+        return datetime.now().weekday() >= 5
+    
+    def tirer_recette(self, contexte=""):
+        """Recette pré-générée pour le contexte courant (génération directe si la réserve est vide)"""
+        cle = (self._est_weekend(), contexte)
+        with self._reserves_lock:
+            reserve = self._reserves.get(cle)
+            recette = reserve.popleft() if reserve else None
+        
+        # Recharger la réserve en arrière-plan, la requête n'attend pas
+        self.planifier_reserve(contexte, cle[0])
+        
+        if recette is None:
+            recette = self.generer_recette_contextuelle(contexte, is_weekend=cle[0])
+        return recette
+    
+    def planifier_reserve(self, contexte="", is_weekend=None):
+        """Demande au producteur d'arrière-plan de remplir la réserve d'un contexte"""
+        if is_weekend is None:
+            is_weekend = self._est_weekend()
+        self._planifier(self._remplir_reserve, (is_weekend, contexte))
+    
+    def planifier_maintenance_banque(self, nombre=3):
+        """Enrichissement de la banque en arrière-plan, au plus une fois par intervalle"""
+        if time.monotonic() - self._derniere_maintenance < INTERVALLE_MAINTENANCE:
+            return
+        self._planifier(self._maintenir_banque, nombre)
+    
+    def _planifier(self, fonction, argument):
+        """Ajoute une tâche au producteur, sauf si la même est déjà en attente"""
+        tache = (fonction.__name__, argument)
+        with self._reserves_lock:
+            if tache in self._en_attente:
+                return
+            self._en_attente.add(tache)
+        
+        self._demarrer_producteur()
+        self._taches.put((fonction, argument))
+    
+    def _demarrer_producteur(self):
+        # Démarrage paresseux : un thread créé avant un fork (gunicorn) n'existe pas dans le worker
+        with self._reserves_lock:
+            if self._producteur is not None and self._producteur.is_alive() and self._producteur_pid == os.getpid():
+                return
+            self._producteur_pid = os.getpid()
+            self._producteur = threading.Thread(target=self._produire, name='producteur-recettes', daemon=True)
+            self._producteur.start()
+    
+    def _produire(self):
+        """Boucle du producteur : exécute les tâches d'arrière-plan une par une"""
+        while True:
+            fonction, argument = self._taches.get()
+            try:
+                fonction(argument)
+            except Exception as e:
+                print(f"Erreur tâche {fonction.__name__}({argument}): {e}")
+            finally:
+                with self._reserves_lock:
+                    self._en_attente.discard((fonction.__name__, argument))
+    
+    def _remplir_reserve(self, cle):
+        is_weekend, contexte = cle
+        # Une seule analyse des préférences par remplissage
+        preferences = self.analyser_preferences()
+        nouvelles = [
+            self.generer_recette_contextuelle(contexte, preferences, is_weekend)
+            for _ in range(TAILLE_RESERVE)
+        ]
+        
+        with self._reserves_lock:
+            reserve = self._reserves.pop(cle, None)
+            if reserve is None:
+                reserve = deque(maxlen=TAILLE_RESERVE)
+            reserve.extend(nouvelles[:TAILLE_RESERVE - len(reserve)])
+            self._reserves[cle] = reserve  # Contexte le plus récent en dernier
+            while len(self._reserves) > MAX_CONTEXTES_RESERVE:
+                self._reserves.popitem(last=False)
+    
+    def _maintenir_banque(self, nombre):
+        self._derniere_maintenance = time.monotonic()
+        # Sans action de l'utilisateur : ne jamais toucher une préférence existante
+        ajoutees = self.ajouter_recettes_banque(nombre, nouvelles_seulement=True)
+        print(f"📚 Maintenance banque : {len(ajoutees)} recettes ajoutées")
+    
     def _construire_recette(self, temps_max, difficulte, types_possibles, contexte=""):
         """Construit une recette complète"""
         
@@ -192,12 +299,19 @@ class GenerateurRecettes:
         
         return tags[:4]  # Limiter à 4 tags
     
-    def ajouter_recettes_banque(self, nombre=5):
-        """Ajoute des recettes de la banque à la base principale"""
+    def ajouter_recettes_banque(self, nombre=5, nouvelles_seulement=False):
+        """Ajoute des recettes de la banque à la base principale
+        
+        nouvelles_seulement : recettes sans préférence enregistrée uniquement, aucune
+        ligne existante n'est modifiée (maintenance en arrière-plan).
+        """
         recettes_ajoutees = []
         
         # Sélectionner des recettes de la banque
-        banque_keys = list(self.banque_recettes.keys())
+        banque_keys = [
+            recette_id for recette_id in self.banque_recettes
+            if not (nouvelles_seulement and recette_id in self.preferences)
+        ]
         random.shuffle(banque_keys)
         
         for i in range(min(nombre, len(banque_keys))):
@@ -207,14 +321,18 @@ class GenerateurRecettes:
             # Ajuster le score selon les préférences
             recette['score_base'] = self._ajuster_score_banque(recette)
             
-            # L'ajouter à la DB
-            self._sauvegarder_recette_db(recette_id, recette)
             recettes_ajoutees.append({
                 'id': recette_id,
                 'nom': recette['nom'],
                 'score': recette['score_base']
             })
         
+        # L'ajouter à la DB en une seule transaction
+        self.preferences.enregistrer_recettes(
+            [(r['id'], r['score']) for r in recettes_ajoutees],
+            remplacer_frequence=not nouvelles_seulement
+        )
+        
         return recettes_ajoutees
     
     def _ajuster_score_banque(self, recette):
@@ -235,41 +353,20 @@ class GenerateurRecettes:
         
         return score
     
-    def _sauvegarder_recette_db(self, recette_id, recette):
-        """Sauvegarde une nouvelle recette en DB"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO preferences_recettes 
-                (recette_id, choisi, frequence_reelle, date_derniere_suggestion)
-                VALUES (?, 0, ?, ?)
-            ''', (recette_id, recette['score_base'], datetime.now().date()))
-            
-            conn.commit()
-        except Exception as e:
-            print(f"Erreur sauvegarde recette {recette_id}: {e}")
-        
-        conn.close()
-    
     def generer_suggestions_enrichies(self, nombre=6):
         """Génère des suggestions enrichies (base + nouvelles + banque)"""
         suggestions = []
         
         # 1. Ajouter quelques recettes de la banque si base faible
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM preferences_recettes WHERE choisi > 0')
-        nb_recettes_utilisees = cursor.fetchone()[0]
-        conn.close()
+        # (en arrière-plan : ce chemin de lecture n'écrit jamais en DB)
+        nb_recettes_utilisees = self.preferences.nombre_recettes_choisies()
         
         if nb_recettes_utilisees < 10:  # Si peu de données
-            self.ajouter_recettes_banque(3)
+            self.planifier_maintenance_banque(3)
         
         # 2. Générer 1-2 nouvelles recettes IA
         for i in range(2):
-            nouvelle_recette = self.generer_recette_contextuelle()
+            nouvelle_recette = self.tirer_recette()
             recette_id = f"ia_gen_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}"
             
             # L'ajouter temporairement pour les suggestions
@@ -0,0 +1,46 @@
+"""
+Configuration gunicorn (production, plusieurs workers)
+    gunicorn -c gunicorn.conf.py                      # app_final (catalogue Marmiton), port 5001
+    ASSISTANT_APP=app gunicorn -c gunicorn.conf.py    # app (assistant IA), port 5000
+    ASSISTANT_APP=app_async gunicorn -c gunicorn.conf.py  # routes async (Quart + uvicorn), port 5002
+"""
+
+import importlib
+import multiprocessing
+import os
+
+APPLICATION = os.environ.get('ASSISTANT_APP', 'app_final')
+PORTS = {'app': 5000, 'app_final': 5001, 'app_async': 5002}
+
+wsgi_app = f"{APPLICATION}:create_app()"
+bind = os.environ.get('ASSISTANT_BIND', f"0.0.0.0:{PORTS.get(APPLICATION, 5001)}")
+workers = int(os.environ.get('ASSISTANT_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+if APPLICATION == 'app_async':
+    # Une boucle asyncio par worker, SQLite dans le pool de threads de app_async
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.environ.get('ASSISTANT_WORKERS', multiprocessing.cpu_count()))
+else:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('ASSISTANT_THREADS', 4))
+preload_app = False  # Chaque worker construit son assistant (caches, pool, threads de fond)
+timeout = 60
+graceful_timeout = 30
+accesslog = '-'
+
+# Catalogue JSON rechargé dans chaque worker quand un fichier source change (app.py)
+os.environ.setdefault('ASSISTANT_SURVEILLANCE_CATALOGUE', '5')
+
+
+def on_starting(server):
+    """Processus maître : schéma, snapshot catalogue et préférences de départ, une seule fois"""
+    os.makedirs('data', exist_ok=True)
+    importlib.import_module(APPLICATION).initialiser_donnees()
+    os.environ['ASSISTANT_DONNEES_INITIALISEES'] = '1'  # Hérité par les workers
+
+
+def worker_exit(server, worker):
+    """Écrit les choix encore en file avant l'arrêt du worker"""
+    assistant = getattr(importlib.import_module(APPLICATION), 'assistant', None)
+    preferences = getattr(assistant, 'preferences', None)
+    if preferences is not None:
+        preferences.vider_ecritures()
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+Import en masse du catalogue Marmiton
+Recettes lues en flux (JSONL, CSV ou JSON), validées, dédoublonnées par nom normalisé,
+insérées par lots dans une base de préparation puis ajoutées au catalogue de
+data/assistant.db (ou basculées d'un bloc à sa place) sans toucher aux tables d'apprentissage
+"""
+
+import csv
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+
+from index_produits import normaliser
+from migrations import _triggers_version, appliquer_migrations
+
+DB_PATH = 'data/assistant.db'
+TAILLE_LOT_IMPORT = int(os.environ.get('ASSISTANT_TAILLE_LOT_IMPORT', 1000))  # recettes par transaction
+PAS_PROGRESSION = 10000  # recettes lues entre deux messages de progression
+ERREURS_AFFICHEES = 10
+BUSY_TIMEOUT_MS = 30000  # La bascule attend la fin des écritures en cours
+TAILLE_LOT_BASCULE = int(os.environ.get('ASSISTANT_TAILLE_LOT_BASCULE', 5000))  # recettes par transaction de copie
+SUFFIXE_BASCULE = '_bascule'  # tables en cours de copie
+SUFFIXE_ANCIEN = '_ancien'  # tables remplacées, supprimées par tranches après la bascule
+
+TABLES_CATALOGUE = ['recettes_marmiton', 'ingredients_par_personne']
+COLONNES_RECETTES = 'id, nom, nom_normalise, categorie, difficulte, temps_prep, temps_cuisson, portions, description, ingredients_json'
+COLONNES_INGREDIENTS = 'recette_id, ingredient_nom, quantite_base, unite, rayon'
+COLONNES_INGREDIENT_CSV = {'ingredient_nom', 'quantite', 'unite', 'rayon'}  # CSV à une ligne par ingrédient
+
+# Base de préparation jetable : aucune garantie de durabilité tant qu'elle n'est pas basculée
+PRAGMAS_IMPORT = [
+    'PRAGMA journal_mode=OFF',
+    'PRAGMA synchronous=OFF',
+    'PRAGMA locking_mode=EXCLUSIVE',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',  # 64 Mo
+]
+
+
+BilanImport = namedtuple('BilanImport', ['recettes', 'ingredients', 'doublons', 'invalides'])
+
+
+class RecetteInvalide(ValueError):
+    pass
+
+
+def lire_recettes(chemin):
+    """Recettes une par une, en mémoire constante pour JSONL et CSV
+
+    JSONL : une recette par ligne. CSV : une ligne par ingrédient (colonnes de la recette
+    répétées, lignes d'une même recette consécutives) ou une ligne par recette avec une
+    colonne ingredients en JSON. JSON (liste ou {'recettes': [...]}) : chargé en entier.
+    """
+    with open(chemin, 'r', encoding='utf-8', newline='') as f:
+        if chemin.endswith('.jsonl'):
+            for numero, ligne in enumerate(f, 1):
+                if not ligne.strip():
+                    continue
+                try:
+                    yield json.loads(ligne)
+                except json.JSONDecodeError as e:
+                    yield RecetteInvalide(f"ligne {numero} : JSON invalide ({e.msg})")
+            return
+
+        if chemin.endswith('.csv'):
+            yield from _lire_csv(csv.DictReader(f))
+            return
+
+        donnees = json.load(f)
+        yield from donnees['recettes'] if isinstance(donnees, dict) else donnees
+
+
+def _lire_csv(lignes):
+    for nom, groupe in itertools.groupby(lignes, key=lambda ligne: ligne.get('nom')):
+        groupe = list(groupe)
+        recette = {cle: valeur for cle, valeur in groupe[0].items() if cle not in COLONNES_INGREDIENT_CSV}
+        if 'ingredients' in recette:
+            try:
+                recette['ingredients'] = json.loads(recette['ingredients'] or '{}')
+            except json.JSONDecodeError:
+                yield RecetteInvalide(f"{nom!r} : colonne ingredients illisible")
+                continue
+        else:
+            recette['ingredients'] = {
+                ligne['ingredient_nom']: {'quantite': ligne.get('quantite'), 'unite': ligne.get('unite'), 'rayon': ligne.get('rayon')}
+                for ligne in groupe
+                if ligne.get('ingredient_nom')
+            }
+        yield recette
+
+
+def _entier(recette, champ, minimum, defaut=None):
+    valeur = recette.get(champ)
+    if valeur in (None, ''):
+        if defaut is None:
+            raise RecetteInvalide(f"{recette.get('nom')!r} : {champ} manquant")
+        return defaut
+    try:
+        valeur = int(float(valeur))
+    except (TypeError, ValueError):
+        raise RecetteInvalide(f"{recette.get('nom')!r} : {champ} non numérique ({valeur!r})")
+    if valeur < minimum:
+        raise RecetteInvalide(f"{recette.get('nom')!r} : {champ} doit être ≥ {minimum}")
+    return valeur
+
+
+def _texte(valeur):
+    return str(valeur).strip() or None if valeur is not None else None
+
+
+def valider_recette(recette):
+    """Recette conforme au schéma recettes_marmiton / ingredients_par_personne, ou RecetteInvalide"""
+    if isinstance(recette, RecetteInvalide):
+        raise recette
+    if not isinstance(recette, dict):
+        raise RecetteInvalide(f"enregistrement inattendu ({type(recette).__name__})")
+
+    nom = _texte(recette.get('nom'))
+    if not nom or not normaliser(nom):
+        raise RecetteInvalide(f"{recette.get('nom')!r} : nom manquant")
+
+    ingredients = recette.get('ingredients')
+    if isinstance(ingredients, list):  # [{'nom', 'quantite', 'unite', 'rayon'}]
+        ingredients = {ingredient.get('nom'): ingredient for ingredient in ingredients if isinstance(ingredient, dict)}
+    if not isinstance(ingredients, dict) or not ingredients:
+        raise RecetteInvalide(f"{nom!r} : aucun ingrédient")
+
+    ingredients_valides = {}
+    for ingredient_nom, details in ingredients.items():
+        ingredient_nom = _texte(ingredient_nom)
+        if not ingredient_nom or not isinstance(details, dict):
+            raise RecetteInvalide(f"{nom!r} : ingrédient mal formé")
+        try:
+            quantite = float(details.get('quantite'))
+        except (TypeError, ValueError):
+            raise RecetteInvalide(f"{nom!r} : quantité invalide pour {ingredient_nom!r}")
+        if quantite < 0:
+            raise RecetteInvalide(f"{nom!r} : quantité négative pour {ingredient_nom!r}")
+        ingredients_valides[ingredient_nom] = {
+            'quantite': int(quantite) if quantite.is_integer() else quantite,
+            'unite': _texte(details.get('unite')) or '',
+            'rayon': _texte(details.get('rayon')) or 'Autres'
+        }
+
+    return {
+        'nom': nom,
+        'categorie': _texte(recette.get('categorie')),
+        'difficulte': _texte(recette.get('difficulte')),
+        'temps_prep': _entier(recette, 'temps_prep', 0, defaut=0),
+        'temps_cuisson': _entier(recette, 'temps_cuisson', 0, defaut=0),
+        'portions': _entier(recette, 'portions', 1),  # Diviseur des quantités par personne
+        'description': _texte(recette.get('description')),
+        'ingredients': ingredients_valides
+    }
+
+
+def _triggers_catalogue():
+    return [f"trg_version_{table}_{operation}" for table in TABLES_CATALOGUE for operation in ('insert', 'update', 'delete')]
+
+
+def _supprimer_triggers_catalogue(conn):
+    """Un trigger par ligne insérée ferait 1M mises à jour de versions_donnees : on incrémente une fois à la fin"""
+    for trigger in _triggers_catalogue():
+        conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+
+def _recreer_triggers_catalogue(conn):
+    for instruction in _triggers_version('catalogue', TABLES_CATALOGUE):
+        conn.execute(instruction)
+
+
+def _valider_flux(recettes, compteurs, progression):
+    """Recettes valides seulement ; les invalides sont comptées (les premières affichées)"""
+    debut = time.perf_counter()
+    for lues, recette in enumerate(recettes, 1):
+        if progression and lues % PAS_PROGRESSION == 0:
+            duree = time.perf_counter() - debut
+            print(f"⏳ {lues:,} recettes lues ({lues / max(duree, 1e-9):,.0f}/s)"
+                  f" · {compteurs['invalides']:,} invalides · {compteurs['doublons']:,} doublons", flush=True)
+        try:
+            yield valider_recette(recette)
+        except RecetteInvalide as e:
+            compteurs['invalides'] += 1
+            if compteurs['invalides'] <= ERREURS_AFFICHEES:
+                print(f"⚠️ Recette ignorée : {e}")
+
+
+def _lignes_lot(lot, conn, conn_service, prochain_id, ajout=False):
+    """Lignes recettes et ingrédients d'un lot, ids attribués ici (pas de lastrowid)
+
+    Dédoublonnage par nom normalisé : dans le lot, puis contre la base de préparation
+    (index UNIQUE, la mémoire ne dépend pas de la taille du fichier). Une recette déjà
+    présente dans la base en service garde son id, ou est ignorée (doublon) en ajout.
+    """
+    par_cle = {}
+    for recette in lot:
+        par_cle.setdefault(normaliser(recette['nom']), recette)
+    doublons = len(lot) - len(par_cle)
+
+    cles = json.dumps(list(par_cle))
+    for (cle,) in conn.execute(
+        'SELECT nom_normalise FROM recettes_marmiton WHERE nom_normalise IN (SELECT value FROM json_each(?))', (cles,)
+    ):
+        del par_cle[cle]
+        doublons += 1
+
+    ids = {}
+    if conn_service is not None:
+        ids = dict(conn_service.execute(
+            'SELECT nom_normalise, id FROM recettes_marmiton WHERE nom_normalise IN (SELECT value FROM json_each(?))', (cles,)
+        ))
+    if ajout:
+        for cle in ids:
+            del par_cle[cle]
+        doublons += len(ids)
+        ids = {}
+
+    recettes = []
+    ingredients = []
+    for cle, recette in par_cle.items():
+        recette_id = ids.get(cle)
+        if recette_id is None:
+            recette_id = next(prochain_id)
+
+        recettes.append((
+            recette_id,
+            recette['nom'],
+            cle,
+            recette['categorie'],
+            recette['difficulte'],
+            recette['temps_prep'],
+            recette['temps_cuisson'],
+            recette['portions'],
+            recette['description'],
+            json.dumps(recette['ingredients'])
+        ))
+        ingredients.extend(
+            (recette_id, ingredient_nom, details['quantite'], details['unite'], details['rayon'])
+            for ingredient_nom, details in recette['ingredients'].items()
+        )
+    return recettes, ingredients, doublons
+
+
+def preparer_base(recettes, chemin, db_service=None, taille_lot=TAILLE_LOT_IMPORT, progression=False, ajout=False):
+    """Remplit une base neuve avec le catalogue, lot par lot, en mémoire constante
+
+    db_service : base en service (ids conservés pour les recettes déjà connues).
+    ajout : seules les recettes absentes de db_service sont gardées.
+    """
+    compteurs = {'recettes': 0, 'ingredients': 0, 'doublons': 0, 'invalides': 0}
+
+    conn_service = None
+    prochain_id = 1
+    if db_service and os.path.exists(db_service):
+        conn_service = sqlite3.connect(f"file:{db_service}?mode=ro", uri=True)
+        prochain_id = conn_service.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM recettes_marmiton').fetchone()[0]
+    prochain_id = itertools.count(prochain_id)
+
+    conn = sqlite3.connect(chemin, isolation_level=None)
+    try:
+        for pragma in PRAGMAS_IMPORT:
+            conn.execute(pragma)
+        appliquer_migrations(conn)
+        _supprimer_triggers_catalogue(conn)
+
+        valides = _valider_flux(recettes, compteurs, progression)
+        while True:
+            lot = list(itertools.islice(valides, taille_lot))
+            if not lot:
+                break
+            lignes_recettes, lignes_ingredients, doublons = _lignes_lot(lot, conn, conn_service, prochain_id, ajout)
+
+            conn.execute('BEGIN')
+            conn.executemany(
+                f'INSERT INTO recettes_marmiton ({COLONNES_RECETTES}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                lignes_recettes
+            )
+            conn.executemany(
+                f'INSERT INTO ingredients_par_personne ({COLONNES_INGREDIENTS}) VALUES (?, ?, ?, ?, ?)',
+                lignes_ingredients
+            )
+            conn.execute('COMMIT')
+
+            compteurs['recettes'] += len(lignes_recettes)
+            compteurs['ingredients'] += len(lignes_ingredients)
+            compteurs['doublons'] += doublons
+    finally:
+        conn.close()
+        if conn_service is not None:
+            conn_service.close()
+
+    return BilanImport(**compteurs)
+
+
+def _schema_catalogue(conn):
+    """(table, sql de création, [(nom, sql) des index nommés]) des tables du catalogue en service"""
+    schema = []
+    for table in TABLES_CATALOGUE:
+        (sql_table,) = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        index = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+        ).fetchall()
+        schema.append((table, sql_table, index))
+    return schema
+
+
+def _nom_index_bascule(nom):
+    """SQLite ne renomme pas les index : d'une bascule à l'autre ils alternent entre nom et nom_bascule"""
+    return nom[:-len(SUFFIXE_BASCULE)] if nom.endswith(SUFFIXE_BASCULE) else nom + SUFFIXE_BASCULE
+
+
+def _creer_tables_bascule(conn, schema):
+    """Tables <table>_bascule vides, au schéma et avec les index de celles en service"""
+    conn.execute('BEGIN IMMEDIATE')
+    for table, sql_table, index in schema:
+        # Noms entre guillemets après un premier renommage
+        conn.execute(re.sub(rf'^CREATE TABLE "?{table}"?', f'CREATE TABLE {table}{SUFFIXE_BASCULE}', sql_table))
+        for nom, sql_index in index:
+            conn.execute(re.sub(
+                rf'^CREATE (UNIQUE )?INDEX "?{nom}"? ON "?{table}"?',
+                rf'CREATE \1INDEX {_nom_index_bascule(nom)} ON {table}{SUFFIXE_BASCULE}',
+                sql_index
+            ))
+    conn.execute('COMMIT')
+
+
+def _tranche(conn, sql, parametres=()):
+    """Une transaction courte, suivie d'une pause aussi longue qu'elle
+
+    Le busy handler de SQLite réessaie par intervalles croissants : sans pause, une
+    tranche reprendrait le verrou avant qu'un worker en attente ne se réveille.
+    """
+    debut = time.perf_counter()
+    conn.execute('BEGIN IMMEDIATE')
+    lignes = conn.execute(sql, parametres).rowcount
+    conn.execute('COMMIT')
+    time.sleep(time.perf_counter() - debut)
+    return lignes
+
+
+def _copier_par_lots(conn, table, colonnes, taille_lot):
+    """import.<table> → <table>_bascule, une tranche d'ids par transaction"""
+    (id_max,) = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM import.{table}').fetchone()
+    for debut in range(0, id_max, taille_lot):
+        _tranche(conn, f'''
+            INSERT INTO {table}{SUFFIXE_BASCULE} ({colonnes})
+            SELECT {colonnes} FROM import.{table} WHERE id > ? AND id <= ? ORDER BY id
+        ''', (debut, debut + taille_lot))
+
+
+def _supprimer_par_lots(conn, table, taille_lot):
+    """Vide puis supprime une table par tranches (libérer 1M lignes d'un coup bloquerait les workers)"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+        return
+    while _tranche(conn, f'DELETE FROM {table} WHERE id IN (SELECT id FROM {table} ORDER BY id LIMIT ?)', (taille_lot,)):
+        pass
+    _tranche(conn, f'DROP TABLE {table}')
+
+
+def _supprimer_tables(conn, suffixe, taille_lot):
+    for table in reversed(TABLES_CATALOGUE):
+        _supprimer_par_lots(conn, f'{table}{suffixe}', taille_lot * 10)
+
+
+def basculer_catalogue(chemin_import, db_path=DB_PATH, taille_lot=TAILLE_LOT_BASCULE):
+    """Remplace le catalogue de la base en service par celui de la base de préparation
+
+    Échange par renommage de tables : copie par tranches dans des tables <table>_bascule
+    déjà indexées, renommages dans une transaction courte (taille indépendante du catalogue),
+    puis suppression par tranches des anciennes tables. Aucune transaction ne tient le verrou
+    d'écriture plus d'une tranche : les workers continuent d'écrire pendant l'import.
+    Les lecteurs (WAL) voient l'ancien catalogue jusqu'au renommage, les tables
+    d'apprentissage ne sont pas touchées et le fichier n'est jamais remplacé.
+    """
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        appliquer_migrations(conn)
+        conn.execute('ATTACH DATABASE ? AS import', (chemin_import,))
+
+        # Restes d'une bascule interrompue
+        _supprimer_tables(conn, SUFFIXE_ANCIEN, taille_lot)
+        _supprimer_tables(conn, SUFFIXE_BASCULE, taille_lot)
+
+        schema = _schema_catalogue(conn)
+        try:
+            _creer_tables_bascule(conn, schema)
+            _copier_par_lots(conn, 'recettes_marmiton', COLONNES_RECETTES, taille_lot)
+            _copier_par_lots(conn, 'ingredients_par_personne', COLONNES_INGREDIENTS, taille_lot * 10)
+
+            # Sans réécriture des clés étrangères : ingredients_par_personne doit continuer
+            # de référencer recettes_marmiton, pas recettes_marmiton_ancien
+            conn.execute('PRAGMA legacy_alter_table=ON')
+            conn.execute('BEGIN IMMEDIATE')
+            _supprimer_triggers_catalogue(conn)
+            for table in TABLES_CATALOGUE:
+                conn.execute(f'ALTER TABLE {table} RENAME TO {table}{SUFFIXE_ANCIEN}')
+                conn.execute(f'ALTER TABLE {table}{SUFFIXE_BASCULE} RENAME TO {table}')
+            _recreer_triggers_catalogue(conn)
+            # Un seul incrément : tous les caches du catalogue sont invalidés
+            conn.execute("UPDATE versions_donnees SET version = version + 1 WHERE nom = 'catalogue'")
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            _supprimer_tables(conn, SUFFIXE_BASCULE, taille_lot)
+            raise
+        finally:
+            conn.execute('PRAGMA legacy_alter_table=OFF')
+
+        conn.execute('DETACH DATABASE import')
+        _supprimer_tables(conn, SUFFIXE_ANCIEN, taille_lot)
+    finally:
+        conn.close()
+
+
+def ajouter_catalogue(chemin_import, db_path=DB_PATH, taille_lot=TAILLE_LOT_BASCULE):
+    """Ajoute au catalogue en service les recettes de la base de préparation
+
+    Une transaction courte par tranche d'ids : chaque recette arrive avec ses ingrédients.
+    Les ids de la préparation suivent le plus grand id en service ; une recette de même
+    nom normalisé apparue entre-temps est ignorée.
+    """
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('ATTACH DATABASE ? AS import', (chemin_import,))
+        (id_min, id_max) = conn.execute('SELECT MIN(id), MAX(id) FROM import.recettes_marmiton').fetchone()
+        if id_max is not None:
+            for debut in range(id_min - 1, id_max, taille_lot):
+                bornes = (debut, debut + taille_lot)
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(f'''
+                    INSERT INTO recettes_marmiton ({COLONNES_RECETTES})
+                    SELECT {COLONNES_RECETTES} FROM import.recettes_marmiton nouvelle
+                    WHERE id > ? AND id <= ?
+                      AND NOT EXISTS (SELECT 1 FROM recettes_marmiton r WHERE r.nom_normalise = nouvelle.nom_normalise)
+                    ORDER BY id
+                ''', bornes)
+                conn.execute(f'''
+                    INSERT INTO ingredients_par_personne ({COLONNES_INGREDIENTS})
+                    SELECT {COLONNES_INGREDIENTS} FROM import.ingredients_par_personne
+                    WHERE recette_id IN (SELECT id FROM recettes_marmiton WHERE id > ? AND id <= ?)
+                    ORDER BY id
+                ''', bornes)
+                conn.execute('COMMIT')
+        conn.execute('DETACH DATABASE import')
+    finally:
+        conn.close()
+
+
+def importer_recettes(recettes, db_path=DB_PATH, taille_lot=TAILLE_LOT_IMPORT, progression=False, remplacer=False):
+    """Importe un flux de recettes → BilanImport
+
+    Par défaut les recettes s'ajoutent au catalogue en service (celles dont le nom normalisé
+    y existe déjà comptent comme doublons) ; remplacer=True le remplace entièrement.
+    """
+    dossier = os.path.dirname(db_path)
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+
+    if os.path.exists(db_path):
+        # Colonne nom_normalise nécessaire pour retrouver les ids existants
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        appliquer_migrations(conn)
+        conn.close()
+
+    chemin_import = f"{db_path}.import-{os.getpid()}"
+    if os.path.exists(chemin_import):
+        os.remove(chemin_import)
+
+    try:
+        bilan = preparer_base(recettes, chemin_import, db_path, taille_lot, progression, ajout=not remplacer)
+
+        if not os.path.exists(db_path):
+            # Première installation : personne n'a la base ouverte, la préparation devient la base
+            conn = sqlite3.connect(chemin_import)
+            _recreer_triggers_catalogue(conn)
+            conn.execute("UPDATE versions_donnees SET version = version + 1 WHERE nom = 'catalogue'")
+            conn.commit()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.close()
+            os.replace(chemin_import, db_path)
+        elif remplacer:
+            basculer_catalogue(chemin_import, db_path)
+        else:
+            ajouter_catalogue(chemin_import, db_path)
+    finally:
+        if os.path.exists(chemin_import):
+            os.remove(chemin_import)
+
+    return bilan
+
+
+if __name__ == "__main__":
+    # python3 import_recettes.py recettes.{jsonl,csv,json} [data/assistant.db]
+    # Ajout au catalogue existant ; le remplacement complet reste réservé à create_marmiton_db.py
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage : python3 import_recettes.py recettes.{jsonl,csv,json} [base.db]")
+
+    print(f"📥 Import de {sys.argv[1]}...")
+    debut = time.perf_counter()
+    bilan = importer_recettes(
+        lire_recettes(sys.argv[1]),
+        sys.argv[2] if len(sys.argv) > 2 else DB_PATH,
+        progression=True
+    )
+    duree = time.perf_counter() - debut
+    print(f"✅ {bilan.recettes:,} recettes, {bilan.ingredients:,} ingrédients ajoutés en {duree:.2f}s"
+          f" ({bilan.recettes / max(duree, 1e-9):,.0f} recettes/s)")
+    if bilan.doublons:
+        print(f"⚠️ {bilan.doublons:,} recettes en double ignorées (même nom normalisé, dans le fichier ou déjà au catalogue)")
+    if bilan.invalides:
+        print(f"⚠️ {bilan.invalides:,} recettes invalides ignorées")
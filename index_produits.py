@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Index des produits Coop
+Construit une fois au chargement : nom d'ingrédient normalisé → produit, prix, rayon et ordre de passage
+"""
+
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+ProduitCoop = namedtuple('ProduitCoop', ['cle', 'nom', 'unite', 'prix', 'rayon', 'nom_rayon', 'ordre'])
+
+MOTS_VIDES = {'a', 'au', 'aux', 'd', 'de', 'des', 'du', 'en', 'et', 'l', 'la', 'le', 'les'}
+
+# Libellés d'ingrédients (normalisés) sans équivalent direct dans produits_coop.json
+ALIAS_INGREDIENTS = {
+    'poivron_rouge': 'poivrons',
+    'oignon_grelot': 'oignons',
+    'champignon_paris': 'champignons',
+    'riz_basmati': 'riz',
+    'riz_arborio': 'riz',
+    'riz_long_grain': 'riz',
+    'spaghetti': 'pates',
+    'tagliatelle': 'pates',
+    'pate_lasagne': 'pates',
+    'boeuf_braiser': 'bœuf_bourguignon',
+    'paleron_boeuf': 'bœuf_bourguignon',
+}
+
+# Rayons des recettes Marmiton → rayons Coop
+ALIAS_RAYONS = {
+    'Fruits': 'fruits',
+    'Légumes': 'legumes',
+    'Viande': 'viande',
+    'Poisson': 'viande',
+    'Charcuterie': 'charcuterie',
+    'Frais': 'frais',
+    'Fromage': 'fromage',
+    'Pâtes': 'feculents',
+    'Épicerie': 'feculents',
+    'Conserves': 'conserves',
+    'Surgelés': 'surgeles',
+    'Boulangerie': 'pain',
+    'Huiles': 'huiles',
+    'Épices': 'epices',
+    'Épicerie Asiatique': 'asiatique',
+    'Épicerie Exotique': 'asiatique',
+    'Herbes': 'herbes',
+    'Pâtisserie': 'farine',
+    'Alcools': 'alcools',
+}
+
+
+def _singulier(mot):
+    if len(mot) > 3 and mot.endswith('s'):
+        return mot[:-1]
+    if mot.endswith(('aux', 'eux')):
+        return mot[:-1]
+    return mot
+
+
+@lru_cache(maxsize=4096)
+def normaliser(nom):
+    """'Filets de poulet' et 'filets_poulet' → 'filet_poulet' (casse, accents, pluriels, mots vides)"""
+    texte = nom.lower().replace('œ', 'oe').replace('æ', 'ae')
+    texte = unicodedata.normalize('NFKD', texte)
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    mots = re.split(r'[^a-z0-9]+', texte)
+    return '_'.join(_singulier(mot) for mot in mots if mot and mot not in MOTS_VIDES)
+
+
+class IndexProduits:
+    """Recherche O(1) des produits Coop et ordre des rayons précalculé"""
+
+    def __init__(self, produits):
+        rayons = produits.get('rayons', {})
+
+        # Clés des rayons Coop dans l'ordre de passage en magasin
+        self.rayons = sorted(rayons, key=lambda rayon: rayons[rayon]['ordre'])
+        self.noms_rayons = {rayon: rayons[rayon]['nom'] for rayon in self.rayons}
+
+        self._positions_rayons = {}
+        for position, rayon in enumerate(self.rayons):
+            self._positions_rayons[normaliser(rayon)] = position
+            self._positions_rayons[normaliser(self.noms_rayons[rayon])] = position
+        for libelle, rayon in ALIAS_RAYONS.items():
+            if rayon in rayons:
+                self._positions_rayons.setdefault(normaliser(libelle), self.rayons.index(rayon))
+
+        self._produits = {}
+        for position, rayon in enumerate(self.rayons):
+            for rang, (cle, produit) in enumerate(rayons[rayon]['produits'].items()):
+                entree = ProduitCoop(
+                    cle, produit['nom'], produit['unite'], produit['prix_moyen'],
+                    rayon, self.noms_rayons[rayon], (position, rang)
+                )
+                # Accessible par sa clé JSON comme par son nom affiché
+                self._produits.setdefault(normaliser(cle), entree)
+                self._produits.setdefault(normaliser(produit['nom']), entree)
+
+        for alias, cle in ALIAS_INGREDIENTS.items():
+            produit = self._produits.get(normaliser(cle))
+            if produit:
+                self._produits.setdefault(alias, produit)
+
+    def chercher(self, nom_ingredient):
+        """ProduitCoop correspondant à un ingrédient, None si la Coop ne le référence pas"""
+        return self._produits.get(normaliser(nom_ingredient))
+
+    def position_rayon(self, libelle):
+        """Position d'un rayon (clé Coop, nom Coop ou libellé Marmiton), inconnus en dernier"""
+        return self._positions_rayons.get(normaliser(libelle), len(self.rayons))
+
+    def trier_rayons(self, libelles):
+        """Libellés de rayons dans l'ordre de passage en magasin"""
+        return sorted(libelles, key=lambda libelle: (self.position_rayon(libelle), libelle))
+
+    def __len__(self):
+        return len(self._produits)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Listes de courses en masse (plusieurs foyers)
+Matrice recettes × ingrédients chargée une fois depuis ingredients_par_personne,
+calcul pur sans SQLite, réparti sur un pool de processus pour les gros lots hors ligne
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from quantites import AgregateurQuantites, mettre_a_echelle
+
+SEUIL_POOL_PROCESSUS = int(os.environ.get('SEUIL_POOL_PROCESSUS', 200))  # listes par lot
+NB_PROCESSUS = int(os.environ.get('NB_PROCESSUS_LISTES', os.cpu_count() or 1))
+LISTES_PAR_REQUETE_MAX = int(os.environ.get('ASSISTANT_LISTES_PAR_REQUETE_MAX', 1000))  # au-delà : CLI hors ligne
+
+
+class TravailInvalide(ValueError):
+    pass
+
+
+def construire_liste(ingredients, stock_existant, position_rayon):
+    """Liste par rayon à partir des ingrédients [(nom, quantite, unite, rayon)] de toutes les recettes
+
+    Retourne (liste_par_rayon, total_articles) ; rayons dans l'ordre de passage, articles par nom.
+    """
+    quantites = AgregateurQuantites()
+    rayons = {}
+    for nom, quantite, unite, rayon in ingredients:
+        quantites.ajouter(nom, quantite, unite)
+        rayons.setdefault(nom, rayon)
+
+    # Filtrer selon le stock existant
+    liste_finale = {}
+    total_articles = 0
+    for nom, rayon in rayons.items():
+        if not stock_existant.get(nom, False):  # Si pas en stock
+            liste_finale.setdefault(rayon, []).append({
+                'nom': nom,
+                'quantite': quantites.formater(nom),
+                'rayon': rayon
+            })
+            total_articles += 1
+
+    liste_par_rayon = {
+        rayon: sorted(liste_finale[rayon], key=lambda x: x['nom'])
+        for rayon in sorted(liste_finale, key=lambda rayon: (position_rayon(rayon), rayon))
+    }
+    return liste_par_rayon, total_articles
+
+
+class MatriceIngredients:
+    """Toutes les recettes Marmiton et leurs ingrédients par personne, en mémoire
+
+    Données simples (tuples), partageables telles quelles avec les processus du pool.
+    """
+
+    def __init__(self, recettes, positions_rayons, version=None):
+        self.recettes = recettes  # recette_id → (nom, portions, ((ingredient, quantite_base, unite, rayon), ...))
+        self.positions_rayons = positions_rayons
+        self.version = version
+
+    @classmethod
+    def charger(cls, conn, index_produits, version=None):
+        """Une seule requête pour tout le catalogue"""
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT r.id, r.nom, r.portions, i.ingredient_nom, i.quantite_base, i.unite, i.rayon
+            FROM recettes_marmiton r
+            LEFT JOIN ingredients_par_personne i ON i.recette_id = r.id
+            ORDER BY r.id, i.id
+        ''')
+
+        lignes = {}
+        for recette_id, nom_recette, portions, nom, quantite_base, unite, rayon in cursor.fetchall():
+            ingredients = lignes.setdefault(recette_id, (nom_recette, portions, []))[2]
+            if nom is not None:
+                ingredients.append((nom, quantite_base, unite, rayon))
+
+        recettes = {
+            recette_id: (nom_recette, portions, tuple(ingredients))
+            for recette_id, (nom_recette, portions, ingredients) in lignes.items()
+        }
+        rayons = {rayon for _, _, ingredients in recettes.values() for _, _, _, rayon in ingredients}
+        positions_rayons = {rayon: index_produits.position_rayon(rayon) for rayon in rayons}
+        return cls(recettes, positions_rayons, version)
+
+    def position_rayon(self, rayon):
+        return self.positions_rayons.get(rayon, len(self.positions_rayons))
+
+    def _ingredients(self, recettes_ids, nb_personnes):
+        for recette_id in recettes_ids:
+            recette = self.recettes.get(recette_id)
+            if recette is None:
+                continue
+            _, portions, ingredients = recette
+            ratio = nb_personnes / portions
+            for nom, quantite_base, unite, rayon in ingredients:
+                yield nom, mettre_a_echelle(quantite_base, unite, ratio), unite, rayon
+
+    def calculer_liste(self, recettes_ids, nb_personnes=2.5, stock_existant=None):
+        """Même résultat que /api/liste-courses-finale, sans accès à la base"""
+        if stock_existant is None:
+            stock_existant = {}
+
+        # Ordre canonique des recettes, comme l'endpoint unitaire (un ingrédient vu dans deux rayons garde le premier)
+        liste_par_rayon, total_articles = construire_liste(
+            self._ingredients(sorted(recettes_ids), nb_personnes), stock_existant, self.position_rayon
+        )
+        return {
+            'recettes': [self.recettes[recette_id][0] for recette_id in recettes_ids if recette_id in self.recettes],
+            'nb_personnes': nb_personnes,
+            'liste_par_rayon': liste_par_rayon,
+            'total_articles': total_articles,
+            'stock_utilise': stock_existant
+        }
+
+    def calculer_lot(self, travaux, processus=False):
+        """travaux : [{'foyer', 'recettes', 'personnes', 'stock'}] → une liste par travail, dans l'ordre
+
+        processus=True (pré-génération hors ligne seulement) : pool de processus pour les gros lots.
+        En requête le calcul reste séquentiel : démarrer le pool et lui envoyer la matrice
+        coûte plus cher que les lots que l'API accepte (4000 listes : 0.29s contre 0.51s).
+        """
+        if not processus or len(travaux) < SEUIL_POOL_PROCESSUS or NB_PROCESSUS < 2:
+            return [_calculer_travail(self, travail) for travail in travaux]
+
+        # Processus neufs (pas de fork des threads du parent) ; chacun reçoit la matrice
+        # une seule fois, puis des paquets de travaux
+        contexte = multiprocessing.get_context(
+            'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        )
+        taille_paquet = max(1, len(travaux) // (NB_PROCESSUS * 4))
+        with ProcessPoolExecutor(NB_PROCESSUS, mp_context=contexte,
+                                 initializer=_initialiser_processus, initargs=(self,)) as pool:
+            return list(pool.map(_calculer_travail_processus, travaux, chunksize=taille_paquet))
+
+
+def valider_travail(travail):
+    """Vérifie un travail {'foyer', 'recettes', 'personnes', 'stock'} avant calcul (TravailInvalide sinon)"""
+    if not isinstance(travail, dict):
+        raise TravailInvalide("un objet est attendu")
+    recettes = travail.get('recettes', [])
+    if not isinstance(recettes, list):
+        raise TravailInvalide("recettes doit être une liste d'ids")
+    for recette_id in recettes:
+        if isinstance(recette_id, bool) or not isinstance(recette_id, (int, str)) or not str(recette_id).strip().isdigit():
+            raise TravailInvalide(f"id de recette invalide : {recette_id!r}")
+    personnes = travail.get('personnes', 2.5)
+    if isinstance(personnes, bool) or not isinstance(personnes, (int, float)) or personnes <= 0:
+        raise TravailInvalide("personnes doit être un nombre positif")
+    if not isinstance(travail.get('stock', {}), dict):
+        raise TravailInvalide("stock doit être un objet {ingrédient: bool}")
+
+
+def _calculer_travail(matrice, travail):
+    resultat = matrice.calculer_liste(
+        [int(recette_id) for recette_id in travail.get('recettes', [])],
+        travail.get('personnes', 2.5),
+        travail.get('stock', {})
+    )
+    resultat['foyer'] = travail.get('foyer')
+    return resultat
+
+
+_matrice_processus = None
+
+
+def _initialiser_processus(matrice):
+    global _matrice_processus
+    _matrice_processus = matrice
+
+
+def _calculer_travail_processus(travail):
+    return _calculer_travail(_matrice_processus, travail)
+
+
+if __name__ == "__main__":
+    # Pré-génération hors ligne : python3 listes_courses.py travaux.json [listes.json]
+    import app_final
+
+    if len(sys.argv) < 2:
+        raise SystemExit("Usage : python3 listes_courses.py travaux.json [listes.json]")
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        travaux = json.load(f)
+
+    app_final.create_app()
+    debut = time.perf_counter()
+    listes = app_final.assistant.matrice_ingredients().calculer_lot(travaux, processus=True)
+    duree = time.perf_counter() - debut
+
+    sortie = sys.argv[2] if len(sys.argv) > 2 else 'listes_courses.json'
+    with open(sortie, 'w', encoding='utf-8') as f:
+        json.dump(listes, f, ensure_ascii=False)
+    print(f"✅ {len(listes)} listes en {duree:.2f}s ({len(listes) / max(duree, 1e-9):.0f}/s) → {sortie}")
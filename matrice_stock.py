@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Matrice creuse recettes × ingrédients : « que puis-je cuisiner avec mon stock ? »
+Stockage CSR (indptr / indices), un seul produit matrice-vecteur par requête
+"""
+
+from index_produits import normaliser
+
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel, repli sur une boucle Python
+    np = None
+
+try:
+    from scipy.sparse import csr_matrix
+except ImportError:  # SciPy est optionnel, np.bincount fait le produit
+    csr_matrix = None
+
+
+def cle_ingredient(nom, index_produits=None):
+    """Clé commune aux recettes et au stock : produit Coop si connu ('Riz basmati' → riz), sinon nom normalisé"""
+    if index_produits is not None:
+        produit = index_produits.chercher(nom)
+        if produit:
+            return normaliser(produit.cle)
+    return normaliser(nom)
+
+
+class MatriceStock:
+    """Incidence recettes × ingrédients
+
+    recettes : [(recette_id, nom, source, [ingrédients])], une ligne par recette.
+    """
+
+    def __init__(self, recettes, index_produits=None, version=None):
+        self.version = version
+        self.index_produits = index_produits
+        self.colonnes = {}  # clé ingrédient → colonne
+        self.ids = []
+        self.noms = []
+        self.sources = []
+        self.libelles = []  # Nom d'origine de chaque élément non nul (pour lister les manquants)
+
+        indptr = [0]
+        indices = []
+        for recette_id, nom, source, ingredients in recettes:
+            vues = set()
+            for ingredient in ingredients:
+                colonne = self.colonnes.setdefault(cle_ingredient(ingredient, index_produits), len(self.colonnes))
+                if colonne in vues:
+                    continue  # 'oignon' et 'oignons' dans la même recette : une seule fois
+                vues.add(colonne)
+                indices.append(colonne)
+                self.libelles.append(ingredient)
+            self.ids.append(recette_id)
+            self.noms.append(nom)
+            self.sources.append(source)
+            indptr.append(len(indices))
+
+        if np is not None:
+            self.indptr = np.asarray(indptr, dtype=np.int64)
+            self.indices = np.asarray(indices, dtype=np.int32)
+            self.nb_ingredients = np.diff(self.indptr)
+            # Ligne de chaque élément non nul : produit matrice-vecteur par np.bincount
+            self.lignes = np.repeat(np.arange(len(self.ids), dtype=np.int32), self.nb_ingredients)
+            self._csr = None
+            if csr_matrix is not None:
+                donnees = np.ones(len(indices), dtype=np.float32)
+                self._csr = csr_matrix((donnees, self.indices, self.indptr), shape=(len(self.ids), len(self.colonnes)))
+        else:
+            self.indptr = indptr
+            self.indices = indices
+            self.nb_ingredients = [indptr[i + 1] - indptr[i] for i in range(len(self.ids))]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def vecteur_stock(self, ingredients_en_stock):
+        """Colonnes des ingrédients disponibles (inconnus du catalogue ignorés)"""
+        colonnes = {
+            self.colonnes[cle]
+            for cle in (cle_ingredient(nom, self.index_produits) for nom in ingredients_en_stock)
+            if cle in self.colonnes
+        }
+        if np is None:
+            return colonnes
+        vecteur = np.zeros(len(self.colonnes), dtype=np.float32)
+        vecteur[list(colonnes)] = 1
+        return vecteur
+
+    def _couverture(self, stock):
+        """Nombre d'ingrédients disponibles par recette (produit matrice-vecteur)"""
+        if self._csr is not None:
+            return self._csr @ stock
+        return np.bincount(self.lignes, weights=stock[self.indices], minlength=len(self.ids))
+
+    def meilleures(self, stock, limite=10):
+        """[(ligne, disponibles, total)] triées par part du stock utilisée, puis par nombre d'ingrédients disponibles"""
+        if np is None:
+            return self._meilleures_python(stock, limite)
+
+        disponibles = self._couverture(stock)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            couverture = np.where(self.nb_ingredients > 0, disponibles / self.nb_ingredients, 0)
+
+        # Sélection partielle O(N) puis tri des seuls candidats (égalités à la frontière incluses)
+        limite = min(limite, len(self.ids))
+        if limite <= 0:
+            return []
+        seuil = np.partition(couverture, len(couverture) - limite)[len(couverture) - limite]
+        candidats = np.flatnonzero(couverture >= seuil)
+        ordre = candidats[np.lexsort((candidats, -disponibles[candidats], -couverture[candidats]))][:limite]
+        return [(int(ligne), int(disponibles[ligne]), int(self.nb_ingredients[ligne])) for ligne in ordre]
+
+    def _meilleures_python(self, stock, limite):
+        resultats = []
+        for ligne in range(len(self.ids)):
+            debut, fin = self.indptr[ligne], self.indptr[ligne + 1]
+            disponibles = sum(1 for colonne in self.indices[debut:fin] if colonne in stock)
+            total = fin - debut
+            resultats.append((-(disponibles / total if total else 0), -disponibles, ligne, total))
+        resultats.sort()
+        return [(ligne, -disponibles, total) for _, disponibles, ligne, total in resultats[:limite]]
+
+    def manquants(self, ligne, stock):
+        """Ingrédients de la recette absents du stock"""
+        debut, fin = int(self.indptr[ligne]), int(self.indptr[ligne + 1])
+        return [
+            self.libelles[position]
+            for position in range(debut, fin)
+            if not (stock[self.indices[position]] if np is not None else self.indices[position] in stock)
+        ]
+
+    def recettes_avec_stock(self, ingredients_en_stock, limite=10):
+        """Recettes qui utilisent le plus le stock, avec ce qu'il manque pour chacune"""
+        stock = self.vecteur_stock(ingredients_en_stock)
+        return [
+            {
+                'id': self.ids[ligne],
+                'nom': self.noms[ligne],
+                'source': self.sources[ligne],
+                'ingredients_disponibles': disponibles,
+                'ingredients_total': total,
+                'couverture': round(disponibles / total, 3) if total else 0.0,
+                'manquants': self.manquants(ligne, stock)
+            }
+            for ligne, disponibles, total in self.meilleures(stock, limite)
+        ]
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Migrations du schéma de data/assistant.db
+Versionnées via PRAGMA user_version, appliquées en place sur les bases existantes
+"""
+
+import sqlite3
+
+from index_produits import normaliser
+
+
+def _triggers_version(nom, tables):
+    """Triggers qui incrémentent versions_donnees.<nom> à chaque écriture sur les tables"""
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{operation.lower()}
+        AFTER {operation} ON {table}
+        BEGIN
+            UPDATE versions_donnees SET version = version + 1 WHERE nom = '{nom}';
+        END
+        '''
+        for table in tables
+        for operation in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+def _remplir_noms_normalises(conn):
+    """nom_normalise des recettes existantes (la normalisation n'existe qu'en Python)
+
+    En cas de collision, seule la première recette reçoit le nom normalisé.
+    """
+    vus = set()
+    lignes = []
+    for recette_id, nom in conn.execute('SELECT id, nom FROM recettes_marmiton ORDER BY id'):
+        cle = normaliser(nom)
+        if cle not in vus:
+            vus.add(cle)
+            lignes.append((cle, recette_id))
+    conn.executemany('UPDATE recettes_marmiton SET nom_normalise = ? WHERE id = ?', lignes)
+
+
+# (version, description, instructions SQL ou fonctions(conn)) - ne jamais modifier
+# une migration publiée, en ajouter une nouvelle à la fin
+MIGRATIONS = [
+    (1, "Tables d'apprentissage (préférences, stock, historique, habitudes)", [
+        '''
+        CREATE TABLE IF NOT EXISTS preferences_recettes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recette_id TEXT,
+            choisi INTEGER DEFAULT 0,
+            refuse INTEGER DEFAULT 0,
+            date_derniere_suggestion DATE,
+            date_derniere_preparation DATE,
+            note_utilisateur INTEGER,
+            frequence_reelle INTEGER DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS stock_maison (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ingredient TEXT UNIQUE,
+            quantite REAL,
+            unite TEXT,
+            date_achat DATE,
+            date_peremption DATE,
+            niveau_stock TEXT DEFAULT 'moyen'
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS historique_courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_courses DATE,
+            recettes_choisies TEXT,
+            liste_courses TEXT,
+            total_estime REAL,
+            commentaires TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS habitudes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pattern_type TEXT,
+            pattern_data TEXT,
+            frequence INTEGER DEFAULT 1,
+            derniere_occurrence DATE
+        )
+        ''',
+    ]),
+    (2, "Catalogue Marmiton (recettes et ingrédients par personne)", [
+        '''
+        CREATE TABLE IF NOT EXISTS recettes_marmiton (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nom TEXT UNIQUE NOT NULL,
+            categorie TEXT,
+            difficulte TEXT,
+            temps_prep INTEGER,
+            temps_cuisson INTEGER,
+            portions INTEGER,
+            description TEXT,
+            ingredients_json TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS ingredients_par_personne (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recette_id INTEGER,
+            ingredient_nom TEXT,
+            quantite_base REAL,
+            unite TEXT,
+            rayon TEXT,
+            FOREIGN KEY (recette_id) REFERENCES recettes_marmiton (id)
+        )
+        ''',
+    ]),
+    (3, "Index de recherche et unicité de preferences_recettes.recette_id", [
+        # Les doublons éventuels n'étaient jamais lus (la première ligne l'emportait)
+        '''
+        DELETE FROM preferences_recettes
+        WHERE id NOT IN (SELECT MIN(id) FROM preferences_recettes GROUP BY recette_id)
+        ''',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_preferences_recette_id ON preferences_recettes (recette_id)',
+        'CREATE INDEX IF NOT EXISTS idx_ingredients_recette_id ON ingredients_par_personne (recette_id)',
+        'CREATE INDEX IF NOT EXISTS idx_historique_date_courses ON historique_courses (date_courses)',
+    ]),
+    (4, "Compteur de version du catalogue Marmiton (invalidation des caches)", [
+        '''
+        CREATE TABLE IF NOT EXISTS versions_donnees (
+            nom TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        "INSERT OR IGNORE INTO versions_donnees (nom, version) VALUES ('catalogue', 0)",
+    ] + _triggers_version('catalogue', ['recettes_marmiton', 'ingredients_par_personne'])),
+    (5, "Compteur de version du stock maison (invalidation du cache des listes)", [
+        "INSERT OR IGNORE INTO versions_donnees (nom, version) VALUES ('stock', 0)",
+    ] + _triggers_version('stock', ['stock_maison'])),
+    (6, "Index de pagination par curseur des recettes Marmiton", [
+        'CREATE INDEX IF NOT EXISTS idx_recettes_categorie_nom_id ON recettes_marmiton (categorie, nom, id)',
+    ]),
+    (7, "Nom normalisé unique des recettes Marmiton (dédoublonnage des imports)", [
+        'ALTER TABLE recettes_marmiton ADD COLUMN nom_normalise TEXT',
+        _remplir_noms_normalises,
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_recettes_nom_normalise ON recettes_marmiton (nom_normalise)',
+    ]),
+    (8, "Compteur de version des préférences (cohérence des caches entre workers)", [
+        "INSERT OR IGNORE INTO versions_donnees (nom, version) VALUES ('preferences', 0)",
+    ] + _triggers_version('preferences', ['preferences_recettes'])),
+    (9, "Clé de tri des recettes sans catégorie (pagination par curseur)", [
+        # NULL rendait la comparaison (categorie, nom, id) > (...) NULL : recettes sautées
+        "ALTER TABLE recettes_marmiton ADD COLUMN categorie_tri TEXT GENERATED ALWAYS AS (COALESCE(categorie, '')) VIRTUAL",
+        # Remplace l'index de la migration 6 (nom alterné par les bascules d'import)
+        'DROP INDEX IF EXISTS idx_recettes_categorie_nom_id',
+        'DROP INDEX IF EXISTS idx_recettes_categorie_nom_id_bascule',
+        'CREATE INDEX IF NOT EXISTS idx_recettes_categorie_tri_nom_id ON recettes_marmiton (categorie_tri, nom, id)',
+    ]),
+]
+
+def version_schema(conn):
+    """Version actuelle du schéma de la base"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def appliquer_migrations(conn):
+    """Applique les migrations manquantes, chacune dans sa propre transaction
+
+    Une transaction déjà ouverte sur la connexion est validée d'abord. BEGIN IMMEDIATE
+    sérialise les processus qui démarrent en même temps : le second relit
+    la version une fois le verrou obtenu et n'applique que ce qui reste.
+    """
+    if conn.in_transaction:
+        conn.commit()
+
+    for version, description, instructions in MIGRATIONS:
+        if version <= version_schema(conn):
+            continue
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if version <= version_schema(conn):
+                conn.rollback()
+                continue
+
+            for instruction in instructions:
+                if callable(instruction):
+                    instruction(conn)
+                else:
+                    conn.execute(instruction)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+        print(f"🗄️ Migration {version} appliquée : {description}")
+
+    return version_schema(conn)
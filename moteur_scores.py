@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Moteurs de scoring des suggestions de recettes
+- 'python' : boucle de référence, recette par recette
+- 'numpy'  : colonnes NumPy, tous les scores en une passe vectorisée (optionnel)
+- 'index'  : index trié des scores statiques, seul le haut du classement est évalué
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # NumPy est optionnel, le moteur Python suffit
+    np = None
+
+CUISINES_BONUS = ['french', 'italian', 'fusion']
+DIFFICULTES_BONUS = ['facile', 'moyen']
+
+# Part du score qui dépend du moment : date de dernière préparation (3), type préféré (3), temps autorisé (2)
+BONUS_DYNAMIQUE_MAX = 3 + 3 + 2
+EPSILON_SCORE = 1e-9  # Marge sur la borne haute (ordre des additions flottantes)
+
+
+def scorer_recette(recette_data, pref, habitudes, maintenant):
+    """Score d'une recette (formule de référence)"""
+    score = recette_data.get('score_base', 5)  # Score de base
+
+    # Score basé sur les préférences historiques
+    if pref:
+        choisi, refuse, derniere_prep, freq = pref
+        score += choisi * 2  # Points pour les choix positifs
+        score -= refuse * 3  # Pénalité pour les refus
+
+        # Bonus si pas préparée récemment
+        if derniere_prep:
+            jours_depuis = (maintenant - datetime.strptime(derniere_prep, '%Y-%m-%d')).days
+            score += min(jours_depuis / 7, 3)  # Max 3 points bonus après 3 semaines
+        else:
+            score += 2  # Bonus pour nouveauté
+    else:
+        score += 1  # Petit bonus pour recettes jamais essayées
+
+    # Score basé sur les habitudes temporelles
+    if recette_data.get('type') in habitudes.get('type_preferred', []):
+        score += 3
+
+    if recette_data.get('temps_prep', 30) <= habitudes.get('temps_autorise', 30):
+        score += 2
+
+    # Bonus cuisine préférée
+    if recette_data.get('cuisine') in CUISINES_BONUS:
+        score += 1
+
+    # Bonus pour recettes adaptées famille
+    if recette_data.get('difficulte') in DIFFICULTES_BONUS:
+        score += 1
+
+    return score
+
+
+def score_statique(recette_data, pref):
+    """Part du score indépendante du moment (le reste vaut au plus BONUS_DYNAMIQUE_MAX)"""
+    score = recette_data.get('score_base', 5)
+    if pref:
+        choisi, refuse, derniere_prep, freq = pref
+        score += choisi * 2 - refuse * 3
+        if not derniere_prep:
+            score += 2
+    else:
+        score += 1
+    if recette_data.get('cuisine') in CUISINES_BONUS:
+        score += 1
+    if recette_data.get('difficulte') in DIFFICULTES_BONUS:
+        score += 1
+    return score
+
+
+def scorer_recettes(toutes_recettes, preferences, habitudes, maintenant=None):
+    """Calcule le score de chaque recette (boucle Python de référence)"""
+    if maintenant is None:
+        maintenant = datetime.now()
+
+    return {
+        recette_id: scorer_recette(recette_data, preferences.get(recette_id), habitudes, maintenant)
+        for recette_id, recette_data in toutes_recettes.items()
+    }
+
+
+class MoteurScoresPython:
+    """Moteur de référence : recalcule tout à chaque requête"""
+
+    def __init__(self, toutes_recettes, preferences):
+        self.toutes_recettes = toutes_recettes
+        self.preferences = preferences
+
+    def classer(self, habitudes, maintenant=None):
+        """Liste (recette_id, score) triée par score décroissant"""
+        recettes_scores = scorer_recettes(self.toutes_recettes, self.preferences, habitudes, maintenant)
+        return sorted(recettes_scores.items(), key=lambda x: x[1], reverse=True)
+
+    def parcourir(self, habitudes, maintenant=None):
+        return iter(self.classer(habitudes, maintenant))
+
+
+class MoteurScoresNumpy:
+    """Moteur vectorisé : attributs et compteurs stockés en colonnes NumPy
+
+    Les champs catégoriels sont encodés en entiers et les dates en jours
+    (ordinal), le classement est identique à celui du moteur Python.
+    """
+
+    def __init__(self, toutes_recettes, preferences):
+        if np is None:
+            raise ImportError("NumPy est requis pour le moteur de scores 'numpy'")
+
+        self._lock = threading.Lock()
+        self.ids = list(toutes_recettes.keys())
+        self.positions = {recette_id: i for i, recette_id in enumerate(self.ids)}
+        n = len(self.ids)
+
+        # Attributs recettes (statiques)
+        self.codes_types = {}
+        self.score_base = np.empty(n, dtype=np.float64)
+        self.temps_prep = np.empty(n, dtype=np.float64)
+        self.type_code = np.empty(n, dtype=np.int64)
+        self.bonus_cuisine = np.zeros(n, dtype=bool)
+        self.bonus_difficulte = np.zeros(n, dtype=bool)
+
+        # Compteurs de préférences (mis à jour au fil des choix)
+        self.a_preference = np.zeros(n, dtype=bool)
+        self.choisi = np.zeros(n, dtype=np.int64)
+        self.refuse = np.zeros(n, dtype=np.int64)
+        self.a_date_prep = np.zeros(n, dtype=bool)
+        self.jour_prep = np.zeros(n, dtype=np.int64)
+
+        for i, (recette_id, recette_data) in enumerate(toutes_recettes.items()):
+            self.score_base[i] = recette_data.get('score_base', 5)
+            self.temps_prep[i] = recette_data.get('temps_prep', 30)
+            self.type_code[i] = self.codes_types.setdefault(recette_data.get('type'), len(self.codes_types))
+            self.bonus_cuisine[i] = recette_data.get('cuisine') in CUISINES_BONUS
+            self.bonus_difficulte[i] = recette_data.get('difficulte') in DIFFICULTES_BONUS
+            self._ecrire_preference(i, preferences.get(recette_id))
+
+    def _ecrire_preference(self, i, pref):
+        if not pref:
+            self.a_preference[i] = False
+            return
+
+        choisi, refuse, derniere_prep, freq = pref
+        self.a_preference[i] = True
+        self.choisi[i] = choisi
+        self.refuse[i] = refuse
+        self.a_date_prep[i] = bool(derniere_prep)
+        if derniere_prep:
+            self.jour_prep[i] = datetime.strptime(derniere_prep, '%Y-%m-%d').toordinal()
+
+    def mettre_a_jour(self, recette_id, pref):
+        """Met à jour les compteurs d'une recette"""
+        self.mettre_a_jour_lot({recette_id: pref})
+
+    def mettre_a_jour_lot(self, changements):
+        """Met à jour les compteurs de {recette_id: pref} (abonné au cache de préférences)"""
+        with self._lock:
+            for recette_id, pref in changements.items():
+                i = self.positions.get(recette_id)
+                if i is not None:
+                    self._ecrire_preference(i, pref)
+
+    def scorer(self, habitudes, maintenant=None):
+        """Tableau des scores, dans l'ordre de self.ids"""
+        if maintenant is None:
+            maintenant = datetime.now()
+
+        with self._lock:
+            # Même ordre d'additions que la boucle Python pour des flottants identiques
+            scores = self.score_base.copy()
+            scores += np.where(self.a_preference, self.choisi * 2, 0)
+            scores -= np.where(self.a_preference, self.refuse * 3, 0)
+
+            jours_depuis = maintenant.toordinal() - self.jour_prep
+            bonus_date = np.where(self.a_date_prep, np.minimum(jours_depuis / 7, 3), 2)
+            scores += np.where(self.a_preference, bonus_date, 1)
+
+        codes_preferes = [self.codes_types[t] for t in habitudes.get('type_preferred', []) if t in self.codes_types]
+        scores += np.where(np.isin(self.type_code, codes_preferes), 3, 0)
+        scores += np.where(self.temps_prep <= habitudes.get('temps_autorise', 30), 2, 0)
+        scores += np.where(self.bonus_cuisine, 1, 0)
+        scores += np.where(self.bonus_difficulte, 1, 0)
+
+        return scores
+
+    def classer(self, habitudes, maintenant=None):
+        """Liste (recette_id, score) triée par score décroissant"""
+        scores = self.scorer(habitudes, maintenant)
+        # Tri stable : à score égal, ordre d'insertion comme sorted(reverse=True)
+        ordre = np.argsort(-scores, kind='stable')
+        ids = self.ids
+        return [(ids[i], score) for i, score in zip(ordre.tolist(), scores[ordre].tolist())]
+
+    def parcourir(self, habitudes, maintenant=None):
+        return iter(self.classer(habitudes, maintenant))
+
+
+class MoteurScoresIndex:
+    """Index trié des scores statiques, tenu à jour à chaque choix
+
+    Par requête, seules les recettes dont la borne haute (score statique +
+    BONUS_DYNAMIQUE_MAX) peut encore atteindre le meilleur candidat restant
+    sont évaluées : les K premières coûtent O(K log N) au lieu d'un tri complet.
+    Le classement est identique à celui du moteur Python.
+    """
+
+    def __init__(self, toutes_recettes, preferences):
+        self.toutes_recettes = toutes_recettes
+        self.positions = {recette_id: i for i, recette_id in enumerate(toutes_recettes)}
+        self._lock = threading.Lock()
+        self._entrees = {
+            recette_id: self._entree(recette_id, recette_data, preferences.get(recette_id))
+            for recette_id, recette_data in toutes_recettes.items()
+        }
+        self._index = sorted(self._entrees.values())
+
+    def _entree(self, recette_id, recette_data, pref):
+        # La position (unique) départage les égalités comme le tri stable de référence
+        return (-score_statique(recette_data, pref), self.positions[recette_id], recette_id, pref)
+
+    def mettre_a_jour(self, recette_id, pref):
+        """Repositionne une recette dans l'index"""
+        self.mettre_a_jour_lot({recette_id: pref})
+
+    def mettre_a_jour_lot(self, changements):
+        """Repositionne les recettes de {recette_id: pref} (abonné au cache de préférences)
+
+        Un seul nouvel index par lot, en O(N + k log k) : un rechargement qui modifie
+        k préférences ne recopie pas l'index k fois.
+        """
+        with self._lock:
+            nouvelles = []
+            for recette_id, pref in changements.items():
+                recette_data = self.toutes_recettes.get(recette_id)
+                if recette_data is not None:
+                    nouvelles.append(self._entree(recette_id, recette_data, pref))
+            if not nouvelles:
+                return
+            if len(nouvelles) == 1:
+                # Cas d'un choix : copie puis déplacement, sans reparcourir les entrées
+                index = list(self._index)
+                del index[bisect_left(index, self._entrees[nouvelles[0][2]])]
+                insort(index, nouvelles[0])
+            else:
+                modifiees = {entree[2] for entree in nouvelles}
+                anciennes = (entree for entree in self._index if entree[2] not in modifiees)
+                index = list(heapq.merge(anciennes, sorted(nouvelles)))
+            for entree in nouvelles:
+                self._entrees[entree[2]] = entree
+            # Nouvelle liste : un parcours en cours garde son instantané cohérent
+            self._index = index
+
+    def parcourir(self, habitudes, maintenant=None):
+        """(recette_id, score) par score décroissant, évalués au fur et à mesure"""
+        if maintenant is None:
+            maintenant = datetime.now()
+
+        index = self._index
+        candidats = []  # Tas (-score, position, recette_id) des recettes déjà évaluées
+        suivante = 0
+
+        while True:
+            # Une recette non évaluée peut passer devant tant que sa borne atteint le meilleur candidat
+            while suivante < len(index) and (
+                not candidats
+                or -index[suivante][0] + BONUS_DYNAMIQUE_MAX + EPSILON_SCORE >= -candidats[0][0]
+            ):
+                _, position, recette_id, pref = index[suivante]
+                score = scorer_recette(self.toutes_recettes[recette_id], pref, habitudes, maintenant)
+                heapq.heappush(candidats, (-score, position, recette_id))
+                suivante += 1
+
+            if not candidats:
+                return
+            score, _, recette_id = heapq.heappop(candidats)
+            yield recette_id, -score
+
+    def classer(self, habitudes, maintenant=None):
+        """Liste (recette_id, score) triée par score décroissant"""
+        return list(self.parcourir(habitudes, maintenant))
+
+
+MOTEURS = {
+    'python': MoteurScoresPython,
+    'numpy': MoteurScoresNumpy,
+    'index': MoteurScoresIndex,
+}
+
+
+def creer_moteur_scores(nom, toutes_recettes, preferences):
+    """Instancie le moteur demandé, repli sur le moteur Python si indisponible"""
+    moteur_cls = MOTEURS.get(nom, MoteurScoresPython)
+    try:
+        return moteur_cls(toutes_recettes, preferences)
+    except ImportError as e:
+        print(f"⚠️ {e}, utilisation du moteur Python")
+        return MoteurScoresPython(toutes_recettes, preferences)
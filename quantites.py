@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Quantités d'ingrédients : unités normalisées, agrégation et affichage
+Chaque quantité est ramenée à une unité de base (g, ml, pièce...), additionnée
+en une passe sur toutes les recettes, puis formatée une seule fois à la fin
+"""
+
+import re
+from functools import lru_cache
+
+# unité → (dimension, facteur vers l'unité de base de la dimension)
+UNITES = {
+    'g': ('masse', 1),
+    'gr': ('masse', 1),
+    'kg': ('masse', 1000),
+    'ml': ('volume', 1),
+    'cl': ('volume', 10),
+    'dl': ('volume', 100),
+    'l': ('volume', 1000),
+    'c.s.': ('volume', 15),
+    'c.c.': ('volume', 5),
+    '': ('piece', 1),
+    'piece': ('piece', 1),
+    'pièce': ('piece', 1),
+    'gousse': ('gousse', 1),
+}
+CUILLERES = {'c.s.': 15, 'c.c.': 5}  # ml, affichées telles quelles si aucune autre unité de volume
+
+_QUANTITE_TEXTE = re.compile(r'^\s*(\d+(?:[.,]\d+)?)\s*(.*?)\s*$')
+_FRACTION_TEXTE = re.compile(r'^\s*(\d+)\s*/\s*(\d+)\s*(.*?)\s*$')
+
+
+@lru_cache(maxsize=1024)
+def analyser(texte):
+    """'600g' → (600, 'g'), '2 c.s.' → (2, 'c.s.'), '1/2 citron' → (0.5, 'citron')
+
+    Sans nombre en tête ('quelques feuilles') : (None, texte), affiché tel quel.
+    """
+    fraction = _FRACTION_TEXTE.match(texte)
+    if fraction:
+        if not int(fraction.group(2)):
+            return None, texte.strip()
+        nombre = int(fraction.group(1)) / int(fraction.group(2))
+        unite = fraction.group(3)
+    else:
+        correspondance = _QUANTITE_TEXTE.match(texte)
+        if not correspondance:
+            return None, texte.strip()
+        nombre = float(correspondance.group(1).replace(',', '.'))
+        unite = correspondance.group(2)
+    return (int(nombre) if nombre.is_integer() else nombre), unite
+
+
+@lru_cache(maxsize=256)
+def normaliser_unite(unite):
+    """(dimension, facteur, unité au singulier) ; les unités inconnues forment leur propre dimension"""
+    unite = (unite or '').strip().lower()
+    if unite in UNITES:
+        return UNITES[unite] + (unite,)
+
+    singulier = unite[:-1] if len(unite) > 3 and unite.endswith('s') else unite
+    if singulier in UNITES:
+        return UNITES[singulier] + (singulier,)
+    return singulier, 1, singulier
+
+
+def _nombre(valeur, decimales=1):
+    valeur = round(valeur, decimales)
+    return str(int(valeur)) if float(valeur).is_integer() else str(valeur)
+
+
+def _pluriel(unite, valeur):
+    return unite + 's' if valeur > 1 and not unite.endswith(('s', 'x')) else unite
+
+
+def _formater(total, dimension, unites):
+    if dimension == 'masse':
+        return f"{_nombre(total / 1000, 2)}kg" if total >= 1000 else f"{_nombre(total, 0)}g"
+
+    if dimension == 'volume':
+        if unites <= CUILLERES.keys():
+            unite = 'c.s.' if 'c.s.' in unites else 'c.c.'
+            return f"{_nombre(total / CUILLERES[unite])} {unite}"
+        return f"{_nombre(total / 1000, 2)}l" if total >= 1000 else f"{_nombre(total, 0)}ml"
+
+    if dimension == 'piece':
+        if unites == {''}:
+            return _nombre(total)
+        return f"{_nombre(total)} {_pluriel('pièce', total)}"
+
+    return f"{_nombre(total)} {_pluriel(dimension, total)}"
+
+
+def mettre_a_echelle(quantite_base, unite, ratio):
+    """Quantité pour un autre nombre de personnes, arrondie intelligemment selon l'unité"""
+    quantite_calculee = quantite_base * ratio
+
+    if unite in ['pièce', 'pièces', 'gousse', 'gousses', 'feuilles']:
+        return max(1, round(quantite_calculee))
+    if unite in ['c.s.', 'c.c.']:
+        return round(quantite_calculee, 1)
+    return round(quantite_calculee)
+
+
+def formater_quantite(quantite, unite):
+    """Affichage d'une quantité isolée ('112g', '2.5 c.s.', '3 pièces')"""
+    dimension, facteur, unite = normaliser_unite(unite)
+    return _formater(quantite * facteur, dimension, {unite})
+
+
+class AgregateurQuantites:
+    """Additionne les quantités par ingrédient, toutes recettes confondues
+
+    Les unités compatibles sont converties (1 c.s. + 100 ml = 115 ml), les
+    unités incompatibles restent séparées ('2 pièces + 300g'), les textes sans
+    nombre sont gardés tels quels ('2 feuilles + quelques feuilles').
+    """
+
+    def __init__(self):
+        # nom → {dimension: [total en unité de base, unités rencontrées]} ; dimension None : [None, [textes]]
+        self._totaux = {}
+
+    def ajouter(self, nom, quantite, unite=None):
+        """quantite numérique avec son unité, ou texte ('600g', '2 c.s.') sans unité"""
+        if unite is None and isinstance(quantite, str):
+            quantite, unite = analyser(quantite)
+
+        par_dimension = self._totaux.setdefault(nom, {})
+        if quantite is None:
+            textes = par_dimension.setdefault(None, [None, []])[1]
+            if unite not in textes:
+                textes.append(unite)
+            return
+
+        dimension, facteur, unite = normaliser_unite(unite)
+        total = par_dimension.get(dimension)
+        if total is None:
+            par_dimension[dimension] = [quantite * facteur, {unite}]
+        else:
+            total[0] += quantite * facteur
+            total[1].add(unite)
+
+    def formater(self, nom):
+        """Quantité totale affichable d'un ingrédient"""
+        return ' + '.join(
+            _formater(total, dimension, unites) if dimension is not None else ' + '.join(unites)
+            for dimension, (total, unites) in self._totaux[nom].items()
+        )
+
+    def __contains__(self, nom):
+        return nom in self._totaux
+
+    def __iter__(self):
+        return iter(self._totaux)
+
+    def __len__(self):
+        return len(self._totaux)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Recherche plein texte dans le catalogue Marmiton
+Index inversé en mémoire : nom, description, catégorie et ingrédients, insensible aux accents
+"""
+
+from bisect import bisect_left
+from math import log
+
+from index_produits import normaliser
+
+# Poids d'un terme selon le champ où il apparaît
+POIDS_CHAMPS = {
+    'nom': 3.0,
+    'ingredients': 2.0,
+    'categorie': 1.5,
+    'description': 1.0,
+}
+
+
+def tokeniser(texte):
+    """'Bœuf à braiser' → ['boeuf', 'braiser'] (mêmes règles que l'index produits)"""
+    return [mot for mot in normaliser(texte or '').split('_') if mot]
+
+
+class IndexRecherche:
+    def __init__(self, recettes, version=None):
+        """recettes : [{'id', 'nom', 'description', 'categorie', 'ingredients': [noms], ...}]"""
+        self.version = version
+        self.recettes = {}
+        self._postings = {}  # terme → {recette_id: poids cumulé des champs}
+
+        for recette in recettes:
+            recette_id = recette['id']
+            self.recettes[recette_id] = recette
+            champs = {
+                'nom': recette.get('nom'),
+                'description': recette.get('description'),
+                'categorie': recette.get('categorie'),
+                'ingredients': ' '.join(recette.get('ingredients', [])),
+            }
+            poids_termes = {}
+            for champ, texte in champs.items():
+                for terme in set(tokeniser(texte)):
+                    poids_termes[terme] = poids_termes.get(terme, 0) + POIDS_CHAMPS[champ]
+            for terme, poids in poids_termes.items():
+                self._postings.setdefault(terme, {})[recette_id] = poids
+
+        self._vocabulaire = sorted(self._postings)
+        nb_recettes = max(len(self.recettes), 1)
+        self._idf = {
+            terme: log(1 + nb_recettes / len(recettes_terme))
+            for terme, recettes_terme in self._postings.items()
+        }
+
+    @classmethod
+    def charger(cls, conn, version=None):
+        """Recettes et noms d'ingrédients en deux requêtes"""
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, nom, categorie, difficulte, temps_prep, temps_cuisson, portions, description
+            FROM recettes_marmiton
+            ORDER BY categorie, nom
+        ''')
+        recettes = {
+            row[0]: {
+                'id': row[0],
+                'nom': row[1],
+                'categorie': row[2],
+                'difficulte': row[3],
+                'temps_prep': row[4],
+                'temps_cuisson': row[5],
+                'portions': row[6],
+                'description': row[7],
+                'temps_total': (row[4] or 0) + (row[5] or 0),  # Temps inconnus (NULL) comptés 0
+                'ingredients': []
+            }
+            for row in cursor.fetchall()
+        }
+
+        cursor.execute('SELECT recette_id, ingredient_nom FROM ingredients_par_personne ORDER BY recette_id, id')
+        for recette_id, ingredient in cursor.fetchall():
+            if recette_id in recettes:
+                recettes[recette_id]['ingredients'].append(ingredient)
+
+        return cls(recettes.values(), version)
+
+    def _postings_prefixe(self, prefixe):
+        """Recettes contenant un terme qui commence par le préfixe (recherche pendant la frappe)"""
+        resultats = {}
+        position = bisect_left(self._vocabulaire, prefixe)
+        while position < len(self._vocabulaire) and self._vocabulaire[position].startswith(prefixe):
+            terme = self._vocabulaire[position]
+            idf = self._idf[terme]
+            for recette_id, poids in self._postings[terme].items():
+                resultats[recette_id] = max(resultats.get(recette_id, 0), poids * idf)
+            position += 1
+        return resultats
+
+    def rechercher(self, requete, page=1, par_page=20):
+        """Recettes contenant tous les termes (le dernier en préfixe), triées par pertinence puis par nom"""
+        termes = tokeniser(requete)
+        if not termes:
+            return {'resultats': [], 'total': 0, 'page': page, 'par_page': par_page}
+
+        scores = None
+        for i, terme in enumerate(termes):
+            if i == len(termes) - 1:
+                scores_terme = self._postings_prefixe(terme)
+            else:
+                idf = self._idf.get(terme, 0)
+                scores_terme = {recette_id: poids * idf for recette_id, poids in self._postings.get(terme, {}).items()}
+
+            if scores is None:
+                scores = scores_terme
+            else:
+                # Intersection : toutes les recettes doivent contenir chaque terme
+                scores = {recette_id: score + scores_terme[recette_id] for recette_id, score in scores.items() if recette_id in scores_terme}
+            if not scores:
+                break
+
+        classement = sorted(scores.items(), key=lambda x: (-x[1], self.recettes[x[0]]['nom']))
+        debut = (page - 1) * par_page
+        resultats = []
+        for recette_id, score in classement[debut:debut + par_page]:
+            recette = {cle: valeur for cle, valeur in self.recettes[recette_id].items() if cle != 'ingredients'}
+            recette['score'] = round(score, 3)
+            resultats.append(recette)
+
+        return {'resultats': resultats, 'total': len(classement), 'page': page, 'par_page': par_page}
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Réponses JSON partagées par app.py, app_final.py et app_async.py (Flask ou Quart)
+"""
+
+
+def reponse_json_ordonnee(app, donnees):
+    """Même corps que jsonify, sans tri des clés : liste_par_rayon garde l'ordre de passage en magasin"""
+    corps = app.json.dumps(donnees, sort_keys=False, separators=(',', ':')) + '\n'
+    return app.response_class(corps, mimetype='application/json')
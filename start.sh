@@ -33,6 +33,16 @@ fi
 
 echo "✅ Tous les fichiers sont présents"
 
+# Compiler le snapshot du catalogue (démarrage rapide)
+python3 catalogue.py
+
+# Production : workers gunicorn (./start.sh prod)
+if [ "$1" = "prod" ]; then
+    pip3 install gunicorn --quiet
+    echo "🚀 Lancement gunicorn (ASSISTANT_APP=${ASSISTANT_APP:-app_final})..."
+    exec gunicorn -c gunicorn.conf.py
+fi
+
 # Démarrer l'application
 echo "🚀 Lancement de l'Assistant Courses..."
 echo "📱 Accès: http://localhost:5000"
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Ordre des rayons dans le JSON brut des listes de courses
+jsonify trie les clés : liste_par_rayon doit garder l'ordre de passage en magasin
+    python3 -m pytest test_ordre_rayons.py
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import app
+import app_final
+import create_marmiton_db
+
+RACINE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='module', autouse=True)
+def donnees(tmp_path_factory):
+    """Copie de data/ (JSON du catalogue) et base Marmiton neuve dans un dossier temporaire"""
+    dossier = tmp_path_factory.mktemp('assistant')
+    shutil.copytree(os.path.join(RACINE, 'data'), dossier / 'data',
+                    ignore=shutil.ignore_patterns('*.db', '*.db-*', '*.pickle'))
+    dossier_initial = os.getcwd()
+    os.chdir(dossier)
+    try:
+        create_marmiton_db.save_to_database(create_marmiton_db.create_marmiton_database())
+        app.create_app()
+        app_final.create_app()
+        yield
+    finally:
+        os.chdir(dossier_initial)
+
+
+def cles_brutes(reponse, chemin):
+    """Clés de l'objet JSON au bout de chemin, dans l'ordre du corps de la réponse"""
+    assert reponse.status_code == 200
+    objet = json.loads(reponse.get_data(as_text=True), object_pairs_hook=lambda paires: paires)
+    for cle in chemin:
+        objet = objet[cle] if isinstance(cle, int) else dict(objet)[cle]
+    return [cle for cle, _ in objet]
+
+
+def verifier_ordre_magasin(rayons, position):
+    assert len(rayons) > 2
+    assert rayons != sorted(rayons)  # Sinon le test passerait aussi avec jsonify
+    positions = [position(rayon) for rayon in rayons]
+    assert positions == sorted(positions)
+
+
+def test_liste_coop_garde_ordre_magasin():
+    reponse = app.app.test_client().post('/api/liste-courses', json={
+        'recettes': list(app.assistant.recettes['recettes_recurrentes'])
+    })
+
+    index_produits = app.assistant.index_produits
+    ordre = [index_produits.noms_rayons[rayon] for rayon in index_produits.rayons]
+    verifier_ordre_magasin(cles_brutes(reponse, ['liste_par_rayon']), ordre.index)
+
+
+def test_liste_finale_garde_ordre_magasin():
+    reponse = app_final.app.test_client().post('/api/liste-courses-finale', json={
+        'recettes': list(range(1, 30)),
+        'personnes': 2
+    })
+
+    verifier_ordre_magasin(cles_brutes(reponse, ['liste_par_rayon']), app_final.assistant.index_produits.position_rayon)
+
+
+def test_lot_garde_ordre_magasin():
+    reponse = app_final.app.test_client().post('/api/listes-courses/lot', json={
+        'listes': [{'foyer': 'a', 'recettes': list(range(1, 30))}, {'foyer': 'b', 'recettes': list(range(10, 20))}]
+    })
+
+    for rang in range(2):
+        verifier_ordre_magasin(
+            cles_brutes(reponse, ['listes', rang, 'liste_par_rayon']), app_final.assistant.index_produits.position_rayon
+        )
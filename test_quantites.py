@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Quantités d'ingrédients : analyse du texte, conversions, agrégation et affichage
+    python3 -m pytest test_quantites.py
+"""
+
+import pytest
+
+from quantites import AgregateurQuantites, analyser, formater_quantite, mettre_a_echelle
+
+
+def total(*quantites):
+    agregateur = AgregateurQuantites()
+    for quantite in quantites:
+        agregateur.ajouter('ingredient', quantite)
+    return agregateur.formater('ingredient')
+
+
+@pytest.mark.parametrize('texte, attendu', [
+    ('600g', (600, 'g')),
+    ('2 c.s.', (2, 'c.s.')),
+    ('1,5 kg', (1.5, 'kg')),
+    ('1/2 citron', (0.5, 'citron')),
+    ('3 / 4 l', (0.75, 'l')),
+    ('quelques feuilles', (None, 'quelques feuilles')),
+    ('1/0 citron', (None, '1/0 citron')),
+])
+def test_analyser(texte, attendu):
+    assert analyser(texte) == attendu
+
+
+@pytest.mark.parametrize('quantites, attendu', [
+    (('quelques feuilles',), 'quelques feuilles'),  # Texte sans nombre gardé tel quel
+    (('2 feuilles', 'quelques feuilles', 'quelques feuilles'), '2 feuilles + quelques feuilles'),
+    (('1/2 citron',), '0.5 citron'),
+    (('1/2 citron', '1 citron'), '1.5 citrons'),
+])
+def test_texte_et_fractions(quantites, attendu):
+    assert total(*quantites) == attendu
+
+
+@pytest.mark.parametrize('quantites, attendu', [
+    (('1 c.s.', '100ml'), '115ml'),
+    (('25 cl', '50cl'), '750ml'),
+    (('500g', '1kg'), '1.5kg'),
+    (('200 gr', '300 g'), '500g'),
+    (('2 c.s.', '1 c.c.'), '2.3 c.s.'),  # Cuillères seules : pas de conversion en ml
+    (('2 pièces', '300g'), '2 pièces + 300g'),  # Dimensions incompatibles séparées
+])
+def test_fusion_entre_unites(quantites, attendu):
+    assert total(*quantites) == attendu
+
+
+@pytest.mark.parametrize('quantites, attendu', [
+    (('999g',), '999g'),
+    (('1000g',), '1kg'),
+    (('600g', '650g'), '1.25kg'),
+    (('999ml',), '999ml'),
+    (('1 l',), '1l'),
+    (('75cl', '50cl'), '1.25l'),
+])
+def test_seuils_kg_et_l(quantites, attendu):
+    assert total(*quantites) == attendu
+
+
+@pytest.mark.parametrize('quantites, attendu', [
+    (('1 pièce',), '1 pièce'),
+    (('1 pièce', '2 pieces'), '3 pièces'),
+    (('2 gousses', '1 gousse'), '3 gousses'),
+    (('1 feuille', '2 feuilles'), '3 feuilles'),
+    (('2', '1'), '3'),
+])
+def test_pluriels(quantites, attendu):
+    assert total(*quantites) == attendu
+
+
+def test_formater_quantite():
+    assert formater_quantite(3, 'pièce') == '3 pièces'
+    assert formater_quantite(1500, 'g') == '1.5kg'
+    assert formater_quantite(2.5, 'c.s.') == '2.5 c.s.'
+    assert formater_quantite(1250, 'ml') == '1.25l'
+
+
+def test_mettre_a_echelle():
+    assert mettre_a_echelle(150, 'g', 2.5) == 375
+    assert mettre_a_echelle(0.25, 'pièce', 1) == 1  # Jamais moins d'une pièce
+    assert mettre_a_echelle(1, 'c.s.', 1.25) == 1.2